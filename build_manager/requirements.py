@@ -1,4 +1,5 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 
 class Requirements(object):
@@ -6,36 +7,64 @@ class Requirements(object):
     of requirements files.
     """
 
+    @property
+    def in_dir(self):
+        """ The directory of the source files. """
+        return self._in_dir
+
+    @in_dir.setter
+    def in_dir(self, val):
+        """ The directory of the source files. """
+        self._in_dir = val
+        self._joined_in_files = None
+
     @property
     def in_files(self):
         """ The files used as source. """
-        return [os.path.join(self.in_dir, f) for f in self._in_files]
+        if self._joined_in_files is None:
+            self._joined_in_files = [os.path.join(self.in_dir, f) for f in self._in_files]
+        return self._joined_in_files
 
     @in_files.setter
     def in_files(self, val):
         """ The files used as source. """
         self._in_files = val
+        self._joined_in_files = None
+
+    @property
+    def out_dir(self):
+        """ The directory of the destination file. """
+        return self._out_dir
+
+    @out_dir.setter
+    def out_dir(self, val):
+        """ The directory of the destination file. """
+        self._out_dir = val
+        self._joined_out_file = None
 
     @property
     def out_file(self):
         """ The file used as destination. """
-        return os.path.join(self.out_dir, self._out_file)
+        if self._joined_out_file is None:
+            self._joined_out_file = os.path.join(self.out_dir, self._out_file)
+        return self._joined_out_file
 
     @out_file.setter
     def out_file(self, val):
         """ The file used as destination. """
         self._out_file = val
+        self._joined_out_file = None
 
     def __init__(self, **kwargs):
         self.env = kwargs.get('env', '')
         self.out_dir = kwargs.get('out_dir', '')
-        self._out_file = kwargs.get('out_file', '')
+        self.out_file = kwargs.get('out_file', '')
         self.in_dir = kwargs.get('in_dir', '')
-        self._in_files = kwargs.get('in_files', [])
+        self.in_files = kwargs.get('in_files', [])
 
     def get_compile_command(self, in_files=(), out_file=''):
-        """ Returns the compiled command for pip-compile. If no files are provided, the instance
-        files will be used.
+        """ Returns the argument list of the pip-compile command. If no files are provided, the
+        instance files will be used.
 
         :type in_files: Iterable
         :param in_files: a list of paths that represent the input files for the pip-compile command
@@ -43,22 +72,25 @@ class Requirements(object):
         :type out_file: str
         :param out_file: a path representing the file that the pip-compile command will use as
             destination
+
+        :rtype: list[str]
         """
 
-        return (
-            f'pip-compile --output-file '
-            f'{out_file or self.out_file} '
-            f'{" ".join(in_files or self.in_files)}')
+        return [
+            'pip-compile', '--output-file', out_file or self.out_file,
+            *(in_files or self.in_files)]
 
     def get_sync_command(self, reqs_file=''):
-        """ Returns the compiled command for pip-sync. If no requirements file is provided, the
-        out_file will be used.
+        """ Returns the argument list of the pip-sync command. If no requirements file is
+        provided, the out_file will be used.
 
         :type reqs_file: str
         :param reqs_file: the requirements file
+
+        :rtype: list[str]
         """
 
-        return f'pip-sync {reqs_file or self.out_file}'
+        return ['pip-sync', reqs_file or self.out_file]
 
     def check_missing_out_file(self):
         """ Checks if the out file is missing. This should be relevant only after creating it.
@@ -67,28 +99,49 @@ class Requirements(object):
         :return: True - file exists
         """
 
-        return self._check_file_exists(self.out_file)
+        return os.path.isfile(self.out_file)
+
+    def is_out_file_up_to_date(self):
+        """ Checks if the out file was written after the last change of all the input files, in
+        which case compiling it again with the same pins would produce the same file. The files
+        included by the input files (with `-r`) are not checked.
+
+        :rtype: bool
+        :return: True - the out file exists and is newer than all the input files
+        """
+
+        try:
+            out_mtime = os.stat(self.out_file).st_mtime_ns
+            return all(os.stat(path).st_mtime_ns < out_mtime for path in self.in_files)
+        except OSError:
+            # a missing file means the out file has to be built (or the error reported)
+            return False
 
     def get_missing_in_files(self):
-        """ Returns a list of all missing input files.
+        """ Returns a list of all missing input files. The input directory is scanned once
+        instead of checking each file separately.
 
         :rtype: list[str]
         :return: a list of all missing input files
         """
-        return [f for f in self.in_files if not self._check_file_exists(f)]
 
-    @staticmethod
-    def _check_file_exists(file):
-        """ Checks if a path is an existing file.
+        try:
+            with os.scandir(self.in_dir or os.curdir) as entries:
+                existing = {entry.name for entry in entries if entry.is_file()}
+        except FileNotFoundError:
+            existing = set()
 
-        :type file: str
-        :param file: the path of the file
+        # files not found by the scan (ex: nested paths) are checked individually
+        unscanned = [path for f, path in zip(self._in_files, self.in_files) if f not in existing]
 
-        :rtype: bool
-        :return: True - the file exists
-        """
+        # on network filesystems each stat can take a while, so several are done in parallel
+        if len(unscanned) > 2:
+            with ThreadPoolExecutor(max_workers=min(8, len(unscanned))) as executor:
+                found = list(executor.map(os.path.isfile, unscanned))
+        else:
+            found = [os.path.isfile(path) for path in unscanned]
 
-        return os.path.isfile(file)
+        return [path for path, is_file in zip(unscanned, found) if not is_file]
 
     @staticmethod
     def _check_dir_exists(directory):
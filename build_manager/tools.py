@@ -1,17 +1,52 @@
 import subprocess
+from collections import namedtuple
 
+CommandResult = namedtuple('CommandResult', ['args', 'returncode', 'stdout', 'stderr'])
 
-def run_command(command):
-    """ Runs a command with subprocess.run
+
+def start_command(command):
+    """ Starts a command with subprocess.Popen without waiting for it to finish. Use
+    `wait_command` to collect its result.
 
     :type command: list|str
     :param command: the command that will be executed
 
-    :rtype: CompletedProcess
+    :rtype: subprocess.Popen
+    :return: the running process
     """
 
-    return subprocess.run(
+    return subprocess.Popen(
         command,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
+        bufsize=-1,
         universal_newlines=True)
+
+
+def wait_command(process):
+    """ Waits for a process started by `start_command` to finish. Both output pipes are drained
+    by `communicate`, so a command with a large output cannot block on a full pipe.
+
+    :type process: subprocess.Popen
+    :param process: the running process
+
+    :rtype: CommandResult
+    :return: the command, its return code and its outputs
+    """
+
+    stdout, stderr = process.communicate()
+
+    return CommandResult(process.args, process.returncode, stdout, stderr)
+
+
+def run_command(command):
+    """ Runs a command with subprocess.Popen and waits for it to finish.
+
+    :type command: list|str
+    :param command: the command that will be executed
+
+    :rtype: CommandResult
+    :return: the command, its return code and its outputs
+    """
+
+    return wait_command(start_command(command))
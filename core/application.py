@@ -3,13 +3,15 @@ from tornado import web
 from core.libs.config_controller import get_config
 from views import MainHandler, SocketHandler
 
+# the route table is built once, the URL patterns are compiled when the specs are created
+HANDLERS = [
+    web.url(r'/', MainHandler),
+    web.url(r'/ws', SocketHandler),
+]
+
 
 class Application(web.Application):
     def __init__(self, *args, **kwargs):
         self.config = get_config()
-        handlers = [
-            (r'/', MainHandler),
-            (r'/ws', SocketHandler),
-        ]
 
-        super(Application, self).__init__(*args, handlers=handlers, **kwargs)
+        super(Application, self).__init__(*args, handlers=HANDLERS, **kwargs)
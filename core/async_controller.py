@@ -1,9 +1,40 @@
-from tornado import concurrent  # noqa: F401 -- used for typing
+import sys
+import threading
+
+from tornado import concurrent
 from tornado import gen
 from tornado.ioloop import IOLoop
 
 from core.libs.exceptions import MissingArgsException
 
+_sync_loop = None  # type: IOLoop
+_sync_loop_lock = threading.Lock()
+
+
+def _get_sync_loop():
+    """ Retrieves the IO Loop used to run synchronous calls. The loop is created on first use and
+    keeps running on a daemon thread, so it is not started and stopped for every call.
+
+    :rtype: IOLoop
+    :return: the running IO Loop
+    """
+
+    global _sync_loop
+
+    if _sync_loop is None:
+        with _sync_loop_lock:
+            if _sync_loop is None:
+                loop = IOLoop(make_current=False)
+
+                def _run_loop():
+                    loop.make_current()
+                    loop.start()
+
+                threading.Thread(target=_run_loop, name='sync-io-loop', daemon=True).start()
+                _sync_loop = loop
+
+    return _sync_loop
+
 
 def run_async(func, *args, **kwargs):
     """ Return the future of a sync function.
@@ -43,9 +74,37 @@ def run_sync(func=None, future=None, *args, **kwargs):
     if not func and not future:
         raise MissingArgsException('Callable or Future')
 
-    ioloop = IOLoop.instance()
-    future = future or func(*args, **kwargs)  # type: concurrent.Future
-    ioloop.add_future(future, lambda _: ioloop.stop())
-    ioloop.start()
+    if future:
+        # a resolved future doesn't need a loop at all
+        if future.done():
+            return future.result()
+
+        # the future is bound to the IO Loop of the calling thread, so that loop has to run it
+        return IOLoop.current().run_sync(lambda: future)
+
+    ioloop = _get_sync_loop()
+    if IOLoop.current(instance=False) is ioloop:
+        raise RuntimeError('run_sync cannot block the thread of the synchronous IO Loop.')
+
+    done = threading.Event()
+    results = []
+
+    def _on_done(result):
+        results.append(result)
+        done.set()
+
+    def _start():
+        # make sure exceptions raised by the call also end up in a future
+        try:
+            result = gen.maybe_future(func(*args, **kwargs))  # type: concurrent.Future
+        except Exception:
+            result = concurrent.Future()
+            result.set_exc_info(sys.exc_info())
+
+        ioloop.add_future(result, _on_done)
+
+    # schedule the call on the running loop and wait for it to finish
+    ioloop.add_callback(_start)
+    done.wait()
 
-    return future.result()
+    return results[0].result()
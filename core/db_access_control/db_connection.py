@@ -1,25 +1,56 @@
+import functools
+import itertools
 import logging
+import threading
+import weakref
 
 import momoko
 from psycopg2 import ProgrammingError
+from psycopg2.extensions import encodings
+from sqlalchemy.sql.compiler import Compiled
 from tornado import gen
 from tornado.concurrent import Future
 from tornado.ioloop import IOLoop
 
 from core.async_controller import run_sync
-from core.db_access_control import sqla_utils
 from core.db_access_control.db_exceptions import exception_wrapper
 from core.db_access_control.ddl_utils.query_builder import QueryBuilder
 from core.libs.config_controller import get_config
 
+# generates the names of the server-side cursors, which must be unique per connection
+_cursor_names = itertools.count()
+
+# the names of the statements prepared on each psycopg2 connection. A reconnected connection
+# is a new object, so its statements are prepared again
+_prepared_statements = weakref.WeakKeyDictionary()
+
+# the connections of a pool are run by the IO Loop the pool was created with, so each loop gets
+# its own pool, which is created and connected only once. Every pool opens the configured number
+# of connections, so a loop which is closed should release its pool through close_pool
+_pools = {}  # type: dict[IOLoop, momoko.Pool]
+_pool_connections = {}  # type: dict[momoko.Pool, Future]
+_pool_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_db_config():
+    """ Retrieves the database configuration. The lookup is done only once since the
+    configuration does not change during the lifetime of the process.
+
+    :rtype: core.libs.config_controller.DatabaseConfig
+    :return: the database configuration object
+    """
+
+    return get_config().database
+
 
-@gen.coroutine
 def _get_pool(io_loop=None):
-    """ Retrieves the Momoko connection pool.
+    """ Retrieves the Momoko connection pool of an IO Loop. The pool is created on the first
+    call for the loop and the same instance is returned afterwards.
 
     :type io_loop: IOLoop
     :param io_loop: the IO Loop that this object will be attached to.
-        Defaults to a new instance if None.
+        Defaults to the current instance if None.
 
     :rtype: momoko.Pool
     :return: the Momoko Pool object
@@ -27,28 +58,53 @@ def _get_pool(io_loop=None):
 
     io_loop = io_loop or IOLoop.current()
 
-    pool = getattr(_get_pool, '_pool', None)  # type: momoko.Pool
-    if not pool:
-        db_config = get_config().database
-
-        pool = momoko.Pool(
-            dsn=db_config.dsn, size=1, ioloop=io_loop, raise_connect_errors=True)
+    pool = _pools.get(io_loop)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(io_loop)
+            if pool is None:
+                db_config = _get_db_config()
 
-        setattr(_get_pool, '_pool', pool)
-    else:
-        pool.ioloop = io_loop
+                pool = _pools[io_loop] = momoko.Pool(
+                    dsn=db_config.dsn,
+                    size=db_config.pool_size,
+                    max_size=db_config.pool_max_size,
+                    ioloop=io_loop,
+                    raise_connect_errors=True)
 
     return pool
 
 
+def _close_pool(io_loop=None):
+    """ Closes the Momoko connection pool of an IO Loop and releases the loop. It should be
+    called before closing a loop which has used the database.
+
+    :type io_loop: IOLoop
+    :param io_loop: the IO Loop to which the pool is attached.
+        Defaults to the current instance if None.
+    """
+
+    io_loop = io_loop or IOLoop.current()
+
+    with _pool_lock:
+        pool = _pools.pop(io_loop, None)
+
+    if pool is not None:
+        _pool_connections.pop(pool, None)
+        pool.close()
+
+
 class DBConnection(object):
 
+    get_db_config = staticmethod(_get_db_config)
     get_pool = staticmethod(_get_pool)
+    close_pool = staticmethod(_close_pool)
 
     @classmethod
     @gen.coroutine
     def get_connection(cls, io_loop=None):
-        """ Connects to the database using a Momoko Pool.
+        """ Connects to the database using a Momoko Pool. The pool is connected only on the
+        first call, concurrent callers wait for the same connection attempt.
 
         :type io_loop: IOLoop
         :param io_loop: the IO Loop to which the pool is attached.
@@ -57,45 +113,367 @@ class DBConnection(object):
         :return: the connected pool
         """
 
-        pool = yield cls.get_pool(io_loop=io_loop)  # type: momoko.Pool
-        connection = yield pool.connect()
+        pool = cls.get_pool(io_loop=io_loop)
+
+        connection = _pool_connections.get(pool)
+        if connection is None or pool.closed:
+            connection = _pool_connections[pool] = pool.connect()
 
-        return connection
+        try:
+            yield connection
+        except Exception:
+            # allow the next call to retry the connection
+            _pool_connections.pop(pool, None)
+            raise
+
+        return pool
 
     @classmethod
-    @gen.coroutine
     def execute_command_wrapper(
-            cls, exception_type=ProgrammingError, message_validator=lambda s: False, **kwargs):
+            cls, exception_type=ProgrammingError, expected_sqlstates=frozenset(),
+            message_validator=None, **kwargs):
         """ Wraps a SQL query execution and consumes an exception which matches the type and
         condition specified.
 
         :param exception_type: the type of the exception to be consumed
 
+        :type expected_sqlstates: frozenset
+        :param expected_sqlstates: the SQLSTATE codes (see `psycopg2.errorcodes`) for which
+            the exception is consumed
+
         :type message_validator: collections.abc.Callable
         :param message_validator: the validator for the exception message
 
         :type kwargs: dict
         :param kwargs: keyword arguments that will be passed to the command executing function
 
-        :rtype: list
-        :return: the result set of the command execution
+        :rtype: Future
+        :return: a Future for the result set of the command execution
         """
 
-        result = yield exception_wrapper(
+        # exception_wrapper is already a coroutine, so its Future is returned directly
+        return exception_wrapper(
             function=cls.execute_command,
             exception_type=exception_type,
+            expected_sqlstates=expected_sqlstates,
             message_validator=message_validator,
             **kwargs
         )
-        return result
+
+    @classmethod
+    def compile_command(cls, command, params=None):
+        """ Compiles a command to its SQL string and bind parameters, if it's not a string
+        already.
+
+        :param command: the SQL command string, an SQLAlchemy object that is compilable or
+            an already compiled SQLAlchemy statement
+
+        :type params: dict
+        :param params: the values of the bind parameters of the command
+
+        :rtype: tuple
+        :return: the SQL string of the command and its bind parameters
+        """
+
+        # the command is compiled for the PostgreSQL dialect, so it doesn't need to be bound
+        if not isinstance(command, str):
+            command, params = QueryBuilder.get_compiled_statement(command, params)
+
+        if cls.get_db_config().debug_sql:
+            logging.info('Running SQL:\n {}'.format(str(command).strip()))
+
+        return command, params
+
+    @classmethod
+    def execute_transaction(cls, commands, io_loop=None, asynchronous=True):
+        """ Executes several SQL commands in a single transaction, which is committed only once
+        after all of them succeed and rolled back if any of them fails.
+
+        :type commands: collections.abc.Iterable
+        :param commands: the SQL command strings or SQLAlchemy objects that are compilable
+
+        :type io_loop: IOLoop
+        :param io_loop: the IO Loop to which the coroutines will be attached
+
+        :type asynchronous: bool
+        :param asynchronous: determines if the commands should by executed asynchronously
+
+        :rtype: list
+        :return: the cursors of the executed commands
+        """
+
+        if asynchronous:
+            return cls.execute_transaction_async(commands=commands, io_loop=io_loop)
+        else:
+            return run_sync(
+                func=cls.execute_transaction_async, commands=commands, io_loop=io_loop)
+
+    @classmethod
+    @gen.coroutine
+    def execute_transaction_async(cls, commands, io_loop=None):
+        """ Executes several SQL commands in a single transaction asynchronously.
+
+        :type commands: collections.abc.Iterable
+        :param commands: the SQL command strings or SQLAlchemy objects that are compilable
+
+        :type io_loop: IOLoop
+        :param io_loop: the IO Loop to which the coroutines will be attached
+
+        :rtype: list
+        :return: the cursors of the executed commands
+        """
+
+        commands = [cls.compile_command(command) for command in commands]
+
+        # momoko expects the statements without parameters as plain strings
+        commands = [
+            command if params is None else (command, params) for command, params in commands]
+
+        conn = yield cls.get_connection(io_loop=io_loop)
+        cursors = yield conn.transaction(commands)
+
+        return cursors
+
+    @classmethod
+    def execute_many(cls, commands, io_loop=None, asynchronous=True):
+        """ Executes several SQL commands with a single round trip to the database. The commands
+        are sent as one multi-statement string, which PostgreSQL runs in a single implicit
+        transaction.
+
+        :type commands: collections.abc.Iterable
+        :param commands: the SQL command strings or SQLAlchemy objects that are compilable
+
+        :type io_loop: IOLoop
+        :param io_loop: the IO Loop to which the coroutines will be attached
+
+        :type asynchronous: bool
+        :param asynchronous: determines if the commands should by executed asynchronously
+
+        :return: the cursor of the last command, or None if no command was given
+        """
+
+        if asynchronous:
+            return cls.execute_many_async(commands=commands, io_loop=io_loop)
+        else:
+            return run_sync(func=cls.execute_many_async, commands=commands, io_loop=io_loop)
+
+    @classmethod
+    @gen.coroutine
+    def execute_many_async(cls, commands, io_loop=None):
+        """ Executes several SQL commands with a single round trip asynchronously.
+
+        :type commands: collections.abc.Iterable
+        :param commands: the SQL command strings or SQLAlchemy objects that are compilable
+
+        :type io_loop: IOLoop
+        :param io_loop: the IO Loop to which the coroutines will be attached
+
+        :return: the cursor of the last command, or None if no command was given
+        """
+
+        commands = [cls.compile_command(command) for command in commands]
+        if not commands:
+            return None
+
+        # the parameters are bound on the client with the connection that runs the commands
+        pool = yield cls.get_connection(io_loop=io_loop)
+        connection = yield pool.getconn()
+
+        try:
+            encoding = encodings[connection.connection.encoding]
+
+            statements = []
+            for command, params in commands:
+                if params:
+                    # the joined string is formatted by psycopg2 again, so the bound values
+                    # must not contain any unescaped placeholder character
+                    command = connection.mogrify(command, params).decode(encoding)
+                    command = command.replace('%', '%%')
+
+                statements.append(command)
+
+            cursor = yield connection.execute(';\n'.join(statements))
+        finally:
+            pool.putconn(connection)
+
+        return cursor
+
+    @classmethod
+    def stream_command(
+            cls, command, on_batch, params=None, batch_size=None, io_loop=None,
+            row_parser=QueryBuilder.list_mapper, parser_kwargs=None, asynchronous=True):
+        """ Executes a query through a server-side cursor and passes the parsed rows to
+        `on_batch`, a batch at a time, so the whole result set is never loaded in memory.
+
+        :param command: the SQL command string, an SQLAlchemy object that is compilable or
+            an already compiled SQLAlchemy statement with bind parameters
+
+        :type on_batch: collections.abc.Callable
+        :param on_batch: a function that receives the list of parsed rows of each batch. If it
+            returns a Future, the next batch is fetched only after the Future is done.
+
+        :type params: dict
+        :param params: the values of the bind parameters of the command
+
+        :type batch_size: int
+        :param batch_size: the number of rows fetched at a time. Defaults to the
+            `batch_size` from the database configuration
+
+        :type io_loop: IOLoop
+        :param io_loop: the IO Loop to which the coroutines will be attached
+
+        :type row_parser: collections.abc.Callable
+        :param row_parser: a function that can receive the following args:
+            values, columns, converter (see `list_mapper` for an example)
+
+        :type parser_kwargs: dict
+        :param parser_kwargs: keyword arguments that will be passed to `row_parser` for each item
+
+        :type asynchronous: bool
+        :param asynchronous: determines if the command should by executed asynchronously
+        """
+
+        kwargs = dict(
+            command=command, on_batch=on_batch, params=params, batch_size=batch_size,
+            io_loop=io_loop, row_parser=row_parser, parser_kwargs=parser_kwargs)
+
+        if asynchronous:
+            return cls.stream_command_async(**kwargs)
+        else:
+            return run_sync(func=cls.stream_command_async, **kwargs)
+
+    @classmethod
+    @gen.coroutine
+    def stream_command_async(
+            cls, command, on_batch, params=None, batch_size=None, io_loop=None,
+            row_parser=QueryBuilder.list_mapper, parser_kwargs=None):
+        """ Executes a query through a server-side cursor asynchronously.
+        See `stream_command` for the arguments.
+        """
+
+        batch_size = batch_size or cls.get_db_config().batch_size
+
+        command, params = cls.compile_command(command, params)
+
+        # the cursor lives in a transaction, so all the commands must use the same connection
+        pool = yield cls.get_connection(io_loop=io_loop)
+        connection = yield pool.getconn()
+
+        cursor_name = 'stream_{}'.format(next(_cursor_names))
+        fetch_command = 'FETCH FORWARD {} FROM {}'.format(batch_size, cursor_name)
+
+        try:
+            yield connection.execute('BEGIN')
+            yield connection.execute(
+                'DECLARE {} NO SCROLL CURSOR FOR {}'.format(cursor_name, command),
+                params if params is not None else ())
+
+            while True:
+                cursor = yield connection.execute(fetch_command)
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                result = on_batch(
+                    cls._parse_rows(rows, cursor.description, row_parser, parser_kwargs))
+                if result is not None:
+                    yield result
+
+            yield connection.execute('COMMIT')
+        except Exception:
+            if not connection.closed:
+                yield connection.execute('ROLLBACK')
+            raise
+        finally:
+            pool.putconn(connection)
+
+    @staticmethod
+    def _parse_rows(rows, description, row_parser, parser_kwargs=None):
+        """ Parses the fetched rows with the given row parser. The rows of the default
+        `list_mapper` are mapped together, so the column names are extracted only once.
+
+        :type rows: list
+        :param rows: the fetched rows
+
+        :param description: the columns (cursor.description)
+
+        :type row_parser: collections.abc.Callable
+        :param row_parser: the function that parses each row
+
+        :type parser_kwargs: dict
+        :param parser_kwargs: kwargs that will be passed to `row_parser` for each row
+
+        :rtype: list
+        :return: the parsed rows
+        """
+
+        parser_kwargs = parser_kwargs or {}
+
+        if row_parser is QueryBuilder.list_mapper:
+            return QueryBuilder.batch_list_mapper(rows, description, **parser_kwargs)
+
+        # bind the parser kwargs and cursor description outside the loop
+        if parser_kwargs:
+            row_parser = functools.partial(row_parser, **parser_kwargs)
+
+        return [row_parser(row, description) for row in rows]
+
+    @classmethod
+    @gen.coroutine
+    def _execute_prepared(cls, compiled, params=None, io_loop=None):
+        """ Executes a compiled statement as a server-side prepared statement. The statement is
+        prepared the first time it runs on a connection, after that only EXECUTE is sent, so
+        the database doesn't parse and plan it again.
+
+        :type compiled: sqlalchemy.sql.compiler.Compiled
+        :param compiled: the compiled statement
+
+        :type params: dict
+        :param params: the values of the bind parameters of the statement
+
+        :type io_loop: IOLoop
+        :param io_loop: the IO Loop to which the coroutines will be attached
+
+        :return: the cursor of the executed statement
+        """
+
+        name, sql, names = QueryBuilder.get_prepared_statement(compiled)
+        values = compiled.construct_params(params)
+
+        # prepared statements belong to a connection, so the same one must run both commands
+        pool = yield cls.get_connection(io_loop=io_loop)
+        connection = yield pool.getconn(ping=False)
+
+        try:
+            prepared = _prepared_statements.setdefault(connection.connection, set())
+            if name not in prepared:
+                yield connection.execute('PREPARE {} AS {}'.format(name, sql))
+                prepared.add(name)
+
+            command = 'EXECUTE {}'.format(name)
+            if names:
+                command += '({})'.format(', '.join(['%s'] * len(names)))
+
+            if cls.get_db_config().debug_sql:
+                logging.info('Running SQL:\n {}'.format(sql.strip()))
+
+            cursor = yield connection.execute(command, [values[key] for key in names])
+        finally:
+            pool.putconn(connection)
+
+        return cursor
 
     @classmethod
     def execute_command(
-            cls, command, io_loop=None, row_parser=QueryBuilder.list_mapper,
-            parser_kwargs=None, async=True):
+            cls, command, params=None, io_loop=None, row_parser=QueryBuilder.list_mapper,
+            parser_kwargs=None, asynchronous=True):
         """ Execute an SQL command.
 
-        :param command: the SQL command string or an SQLAlchemy object that is compilable
+        :param command: the SQL command string, an SQLAlchemy object that is compilable or
+            an already compiled SQLAlchemy statement with bind parameters
+
+        :type params: dict
+        :param params: the values of the bind parameters of the command
 
         :type io_loop: IOLoop
         :param io_loop: the IO Loop to which the coroutines will be attached
@@ -107,16 +485,17 @@ class DBConnection(object):
         :type parser_kwargs: dict
         :param parser_kwargs: keyword arguments that will be passed to `row_parser` for each item
 
-        :type async: bool
-        :param async: determines if the command should by executed asynchronously
+        :type asynchronous: bool
+        :param asynchronous: determines if the command should by executed asynchronously
 
         :rtype: list
         :return: a list of results generated after running row_parser on each row
         """
 
-        if async:
+        if asynchronous:
             return cls.execute_command_async(
                 command=command,
+                params=params,
                 io_loop=io_loop,
                 row_parser=row_parser,
                 parser_kwargs=parser_kwargs
@@ -125,6 +504,7 @@ class DBConnection(object):
             return run_sync(
                 func=cls.execute_command_async,
                 command=command,
+                params=params,
                 io_loop=io_loop,
                 row_parser=row_parser,
                 parser_kwargs=parser_kwargs
@@ -133,10 +513,15 @@ class DBConnection(object):
     @classmethod
     @gen.coroutine
     def execute_command_async(
-            cls, command, io_loop=None, row_parser=QueryBuilder.list_mapper, parser_kwargs=None):
+            cls, command, params=None, io_loop=None, row_parser=QueryBuilder.list_mapper,
+            parser_kwargs=None):
         """ Executes a database command asynchronously.
 
-        :param command: the SQL command string or an SQLAlchemy object that is compilable
+        :param command: the SQL command string, an SQLAlchemy object that is compilable or
+            an already compiled SQLAlchemy statement with bind parameters
+
+        :type params: dict
+        :param params: the values of the bind parameters of the command
 
         :type io_loop: IOLoop
         :param io_loop: the IO Loop to which the coroutines will be attached
@@ -152,51 +537,40 @@ class DBConnection(object):
         :return: a list of results generated after running row_parser on each row
         """
 
-        parser_kwargs = parser_kwargs or {}
-        ret_values = []
-        db_config = get_config().database
-
-        # get a database connection
-        conn = yield cls.get_connection(io_loop=io_loop)
-
-        # compile the command if necessary
-        if not isinstance(command, str):
-            command.bind = sqla_utils.SQLAUtils.get_engine()
-            command = QueryBuilder.get_compiled_command(command)
-
-        if db_config.debug_sql:
-            logging.info('Running SQL:\n {}'.format(str(command).strip()))
+        if isinstance(command, Compiled) and cls.get_db_config().prepare_statements:
+            cursor = yield cls._execute_prepared(command, params, io_loop=io_loop)
+        else:
+            # get a database connection
+            conn = yield cls.get_connection(io_loop=io_loop)
 
-        # execute the command
-        cursor = yield conn.execute(command)
+            command, params = cls.compile_command(command, params)
 
-        while True:
-            # call fetchmany asynchronously
-            results = yield exception_wrapper(
-                function=gen.Task,
-                message_validator=lambda s: s == 'no results to fetch',
-                func=lambda callback: callback(cursor.fetchmany(db_config.batch_size))
-            )
+            # execute the command
+            cursor = yield conn.execute(command, params if params is not None else ())
 
-            # exit the loop if no more results where found
-            if not results:
-                break
+        # commands that don't return rows have no description, so there is nothing to fetch
+        if cursor.description is None:
+            return []
 
-            for result in results:
-                # parse the results and store the returned value
-                ret_value = row_parser(result, cursor.description, **parser_kwargs)
+        # fetch all the results at once since momoko buffers them on the client side
+        results = cursor.fetchall()
 
-                # if the row_parser returned a Future object, yield it
-                if isinstance(ret_value, Future):
-                    # warning: using coroutines for small operations on each row
-                    # greatly increases execution time
-                    ret_value = yield ret_value
+        # without a converter, the default parser returns dicts, which can't be Future objects
+        if row_parser is QueryBuilder.list_mapper and not parser_kwargs:
+            return [
+                ret_value for ret_value in QueryBuilder.batch_list_mapper(
+                    results, cursor.description) if ret_value]
 
-                # don't store if no value was returned
-                if not ret_value:
-                    continue
+        ret_values = cls._parse_rows(results, cursor.description, row_parser, parser_kwargs)
 
-                # store the return value
-                ret_values.append(ret_value)
+        # if the row_parser returned Future objects, yield them
+        if ret_values and isinstance(ret_values[0], Future):
+            # warning: using coroutines for small operations on each row
+            # greatly increases execution time
+            parsed_values = []
+            for ret_value in ret_values:
+                parsed_values.append((yield ret_value))
+            ret_values = parsed_values
 
-        return ret_values
+        # don't store the rows for which no value was returned
+        return [ret_value for ret_value in ret_values if ret_value]
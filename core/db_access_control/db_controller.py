@@ -1,13 +1,105 @@
+import functools
+
 from sqlalchemy.sql import ddl
 from tornado import gen
 
 from core.async_controller import run_sync
 from core.db_access_control.db_connection import DBConnection
-from core.libs.config_controller import get_config
-from models.table_orders import get_table_order
+from core.db_access_control.ddl_utils.query_builder import QueryBuilder
+from models.table_orders import get_table_levels, get_table_order
+
+
+@functools.lru_cache(maxsize=None)
+def _get_ddl_command(ddl_type, element, check_first=True, **kwargs):
+    """ Builds and compiles a DDL statement. The result is cached since the statement built for
+    a given element does not change during the lifetime of the process.
+
+    :param ddl_type: the DDL statement class (ex: CreateTable)
+
+    :param element: the element targeted by the statement (ex: a SQLAlchemy Table)
+
+    :type check_first: bool
+    :param check_first: if True, the statement will check the existence of the element first
+
+    :type kwargs: dict
+    :param kwargs: keyword arguments that will be passed to the DDL statement constructor
+
+    :rtype: str
+    :return: the compiled SQL command
+    """
+
+    return QueryBuilder.get_compiled_command(ddl_type(element, **kwargs).check_first(check_first))
+
+
+def _execute_ddl(ddl_type, element, check_first=True, asynchronous=True, **kwargs):
+    """ Executes a single DDL statement, built and compiled through the DDL command cache.
+
+    :param ddl_type: the DDL statement class (ex: CreateTable)
+
+    :param element: the element targeted by the statement (ex: a SQLAlchemy Table)
+
+    :type check_first: bool
+    :param check_first: if True, the statement will check the existence of the element first
+
+    :type asynchronous: bool
+    :param asynchronous: if True, it will run the function asynchronously
+
+    :type kwargs: dict
+    :param kwargs: keyword arguments that will be passed to the DDL statement constructor
+
+    :return: a Future if asynchronous was True, or the result of the cursor.execute function
+    """
+
+    command = _get_ddl_command(ddl_type, element, check_first, **kwargs)
+
+    return DBConnection.execute_command(command, asynchronous=asynchronous)
+
 
+def _get_tables_ddl_commands(ddl_type, tables, check_first=True):
+    """ Builds the DDL commands for the given tables, ordered by their dependencies.
 
-def create_schema(schema='', check_first=True, async=True):
+    :param ddl_type: the DDL statement class (CreateTable or DropTable)
+
+    :type tables: collections.abc.Iterable
+    :param tables: the SQLAlchemy tables targeted by the statements
+
+    :type check_first: bool
+    :param check_first: if True, the statements will check the existence of the tables first
+
+    :rtype: list
+    :return: the compiled SQL commands
+    """
+
+    levels = get_table_levels(tables, for_drop=ddl_type is ddl.DropTable)
+
+    return [_get_ddl_command(ddl_type, table, check_first) for level in levels for table in level]
+
+
+def execute_ddl_batch(commands, asynchronous=True):
+    """ Executes several DDL commands in a single round trip. The commands are joined in one
+    SQL string, which the database runs as a single implicit transaction.
+
+    :type commands: collections.abc.Iterable
+    :param commands: the SQL command strings or DDL statements that are compilable
+
+    :type asynchronous: bool
+    :param asynchronous: if True, it will run the function asynchronously
+
+    :return: a Future if asynchronous was True, or the result of the cursor.execute function
+    """
+
+    command = ';\n'.join(
+        command if isinstance(command, str) else QueryBuilder.get_compiled_command(command)
+        for command in commands)
+
+    # there is nothing to send to the database
+    if not command:
+        return gen.maybe_future([]) if asynchronous else []
+
+    return DBConnection.execute_command(command, asynchronous=asynchronous)
+
+
+def create_schema(schema='', check_first=True, asynchronous=True):
     """ Creates a schema.
 
     :type schema: str
@@ -16,19 +108,17 @@ def create_schema(schema='', check_first=True, async=True):
     :type check_first: bool
     :param check_first: if True, it will check first if the schema already exists
 
-    :type async: bool
-    :param async: if True, it will run this function asynchronously
+    :type asynchronous: bool
+    :param asynchronous: if True, it will run this function asynchronously
 
-    :return: a Future if async was True, or the result of the cursor.execute function
+    :return: a Future if asynchronous was True, or the result of the cursor.execute function
     """
 
-    schema = schema or get_config().database.schema
-    command = ddl.CreateSchema(schema).check_first(check_first)
+    schema = schema or DBConnection.get_db_config().schema
+    return _execute_ddl(ddl.CreateSchema, schema, check_first, asynchronous=asynchronous)
 
-    return DBConnection.execute_command(command, async=async)
 
-
-def drop_schema(schema='', cascade=False, check_first=True, async=True):
+def drop_schema(schema='', cascade=False, check_first=True, asynchronous=True):
     """ Drops a schema.
 
     :type schema: str
@@ -40,19 +130,18 @@ def drop_schema(schema='', cascade=False, check_first=True, async=True):
     :type check_first: bool
     :param check_first: if True, it will check if the schema does not already exist
 
-    :type async: bool
-    :param async: if True, it will run this function asynchronously
+    :type asynchronous: bool
+    :param asynchronous: if True, it will run this function asynchronously
 
-    :return: a Future if async was True, or the result of the cursor.execute function
+    :return: a Future if asynchronous was True, or the result of the cursor.execute function
     """
 
-    schema = schema or get_config().database.schema
-    command = ddl.DropSchema(schema, cascade=cascade).check_first(check_first)
-
-    return DBConnection.execute_command(command, async=async)
+    schema = schema or DBConnection.get_db_config().schema
+    return _execute_ddl(
+        ddl.DropSchema, schema, check_first, asynchronous=asynchronous, cascade=cascade)
 
 
-def create_table(table, check_first=True, async=True):
+def create_table(table, check_first=True, asynchronous=True):
     """ Creates a table.
 
     :type table: sqlalchemy.Table
@@ -61,16 +150,14 @@ def create_table(table, check_first=True, async=True):
     :type check_first: bool
     :param check_first: if True, it will check if the table already exists
 
-    :type async: bool
-    :param async: if True, it will run the function asynchronously
+    :type asynchronous: bool
+    :param asynchronous: if True, it will run the function asynchronously
     """
 
-    command = ddl.CreateTable(table).check_first(check_first)
-
-    return DBConnection.execute_command(command, async=async)
+    return _execute_ddl(ddl.CreateTable, table, check_first, asynchronous=asynchronous)
 
 
-def drop_table(table, check_first=True, async=True):
+def drop_table(table, check_first=True, asynchronous=True):
     """ Drops a table.
 
     :type table: sqlalchemy.Table
@@ -79,13 +166,11 @@ def drop_table(table, check_first=True, async=True):
     :type check_first: bool
     :param check_first: if True, it will check if the table actually exists
 
-    :type async: bool
-    :param async: if True, it will run the function asynchronously
+    :type asynchronous: bool
+    :param asynchronous: if True, it will run the function asynchronously
     """
 
-    command = ddl.DropTable(table).check_first(check_first)
-
-    return DBConnection.execute_command(command, async=async)
+    return _execute_ddl(ddl.DropTable, table, check_first, asynchronous=asynchronous)
 
 
 @gen.coroutine
@@ -101,10 +186,10 @@ def create_tables(metadata=None, tables=None, check_first=True):
     :param check_first: if True, it will check if the tables actually exist
     """
 
-    tables = tables or metadata.tables.values()
+    tables = tables if tables is not None else metadata.tables.values()
 
-    for table in tables:
-        yield create_table(table, check_first)
+    # the statements are ordered by their dependencies and sent in a single round trip
+    yield execute_ddl_batch(_get_tables_ddl_commands(ddl.CreateTable, tables, check_first))
 
 
 @gen.coroutine
@@ -120,27 +205,31 @@ def drop_tables(metadata=None, tables=None, check_first=True):
     :param check_first: if True, it will check if the tables actually exist
     """
 
-    tables = tables or metadata.tables.values()
+    tables = tables if tables is not None else metadata.tables.values()
 
-    for table in tables:
-        yield drop_table(table, check_first)
+    # the statements are ordered by their dependencies and sent in a single round trip
+    yield execute_ddl_batch(_get_tables_ddl_commands(ddl.DropTable, tables, check_first))
 
 
 @gen.coroutine
 def setup_database(clean=False):
-    """ Creates the schema and all tables required by the app.
+    """ Creates the schema and all tables required by the app. All the DDL commands are sent
+    to the database in a single round trip.
 
     :param clean: if True, it will delete all existing elements
     """
 
+    schema = DBConnection.get_db_config().schema
+    commands = []
+
     if clean:
-        drop_order = yield get_table_order(for_drop=True)
-        yield drop_tables(tables=drop_order)
-        yield drop_schema()
+        commands.extend(_get_tables_ddl_commands(ddl.DropTable, get_table_order(for_drop=True)))
+        commands.append(_get_ddl_command(ddl.DropSchema, schema))
+
+    commands.append(_get_ddl_command(ddl.CreateSchema, schema))
+    commands.extend(_get_tables_ddl_commands(ddl.CreateTable, get_table_order()))
 
-    yield create_schema()
-    create_order = yield get_table_order()
-    yield create_tables(tables=create_order)
+    yield execute_ddl_batch(commands)
 
 
 def setup_database_sync(clean=False):
@@ -1,13 +1,18 @@
-from functools import partial
+from collections import OrderedDict
 
-import sqlalchemy  # noqa F401 -- used for typing
+import sqlalchemy
 from tornado import concurrent  # noqa F401 -- used for typing
+from tornado import gen
 
+from core.async_controller import run_sync
 from core.db_access_control.db_connection import DBConnection
 from core.db_access_control.db_exceptions import (
     IncorrectResultSizeException,
     SaveEntityFailedException, PartialPrimaryKeyException)
-from core.db_access_control.ddl_utils.query_builder import QueryBuilder
+from core.db_access_control.ddl_utils.query_builder import DIALECT, QueryBuilder
+
+# the maximum number of bind parameters postgres accepts in a single statement
+_MAX_BIND_PARAMS = 65535
 
 
 class DBEntity(object):
@@ -17,19 +22,106 @@ class DBEntity(object):
     def __init__(self, *args, **kwargs):
         del args  # ignore the args
 
+        self._ensure_columns()
+
         # not calling super() to prevent SQLA default constructor to trigger
         # providing this functionality manually
-        for key in kwargs:
+        column_keys = self._column_keys
+        for key, value in kwargs.items():
+            # column values are stored directly, the same way rows are loaded by `_from_row`
+            if key in column_keys:
+                self.__dict__[key] = value
+                continue
+
             if not hasattr(self, key):
                 raise TypeError('{key} is an invalid keyword argument for {cls}'.format(
                     key=key, cls=self.__class__.__name__
                 ))
 
-            setattr(self, key, kwargs[key])
+            setattr(self, key, value)
+
+    @classmethod
+    def _ensure_columns(cls):
+        """ Stores the column items of the table on the class. They are identical for all the
+        instances, so they are computed only once, the first time the class is instantiated
+        (`__table__` is not available yet when the class is created).
+        """
+
+        if '_columns_cached' in cls.__dict__:
+            return
+
+        columns = tuple(cls.__table__.columns.items())
+        pk_columns = tuple(cls.__table__.primary_key.columns.items())
+        pk_set = {column for _, column in pk_columns}
+
+        cls.columns = columns
+        cls.pk_columns = pk_columns
+        cls.non_pk_columns = tuple(item for item in columns if item[1] not in pk_set)
+        cls._default_returning = tuple(column for _, column in pk_columns)
+        cls._column_keys = frozenset(key for key, _ in columns)
+
+        # the column keys used by __repr__, in sorted order, and the template they fill in
+        cls._repr_keys = tuple(sorted(column.key for column in cls.__table__.columns))
+        cls._repr_template = '<{name}: {data}>'.format(
+            name=cls.__name__,
+            data=', '.join(
+                '{} = {{}}'.format(key.replace('{', '{{').replace('}', '}}'))
+                for key in cls._repr_keys))
+
+        cls._columns_cached = True
+
+    @classmethod
+    def _build_pk_bind_clause(cls):
+        """ Builds an AND clause that compares the pk columns with bind parameters named
+        `pk_<column>`, so they don't collide with the parameters of the updated columns.
+
+        :rtype: sqlalchemy.sql.elements.BooleanClauseList
+        :return: the built clause
+        """
+
+        return sqlalchemy.and_(*[
+            column == sqlalchemy.bindparam('pk_' + key) for key, column in cls.pk_columns])
+
+    @classmethod
+    def _get_pk_params(cls, values):
+        """ Retrieves the bind parameters of the clause built by `_build_pk_bind_clause`.
+
+        :type values: dict
+        :param values: the pk names and their values
+
+        :rtype: dict
+        :return: the bind parameter names and their values
+        """
+
+        return {'pk_' + key: values[key] for key, _ in cls.pk_columns}
+
+    @classmethod
+    def _get_compiled_statement(cls, key, build, **compile_kwargs):
+        """ Retrieves a compiled statement of this class. The statement is built and compiled
+        only on the first call for a given key, then reused with different bind parameters.
+
+        :type key: collections.abc.Hashable
+        :param key: the key identifying the statement
+
+        :type build: collections.abc.Callable
+        :param build: a function without arguments that builds the SQLAlchemy statement
+
+        :type compile_kwargs: dict
+        :param compile_kwargs: keyword arguments that will be passed to the statement compiler
+
+        :rtype: sqlalchemy.sql.compiler.Compiled
+        :return: the compiled statement
+        """
+
+        statements = cls.__dict__.get('_compiled_statements')
+        if statements is None:
+            statements = cls._compiled_statements = {}
+
+        compiled = statements.get(key)
+        if compiled is None:
+            compiled = statements[key] = build().compile(dialect=DIALECT, **compile_kwargs)
 
-        self.columns = self.__table__.columns.items()
-        self.pk_columns = self.__table__.primary_key.columns.items()
-        self.non_pk_columns = [x for x in self.columns if x not in self.pk_columns]
+        return compiled
 
     def copy_fields(self, entity, all_fields=False):
         """ Copies the fields of the given instance to the current instance
@@ -50,14 +142,14 @@ class DBEntity(object):
             setattr(self, field, getattr(entity, field, None))
 
     @classmethod
-    def create(cls, returning=(), async=True, **kwargs):
+    def create(cls, returning=(), asynchronous=True, **kwargs):
         """ Performs an insert with the given values.
 
         :type returning: tuple|list
         :param returning: the columns which will be returned after the insert is performed
 
-        :type async: bool
-        :param async: if True, performs the action asynchronously
+        :type asynchronous: bool
+        :param asynchronous: if True, performs the action asynchronously
 
         :type kwargs: dict
         :param kwargs: values which will be used to populate the element to be inserted
@@ -65,35 +157,107 @@ class DBEntity(object):
         :return: the value of the column(s) specified in the `returning` field
         """
 
-        command = cls.__table__.insert().values(**kwargs)
+        return cls.create_many([kwargs], returning=returning, asynchronous=asynchronous)
+
+    @classmethod
+    def create_many(cls, rows, returning=(), asynchronous=True):
+        """ Performs a single insert for all the given rows, instead of one insert per row.
+
+        :type rows: list[dict]
+        :param rows: the values of each element to be inserted. All the rows must contain
+            the same keys
+
+        :type returning: tuple|list
+        :param returning: the columns which will be returned after the insert is performed
+
+        :type asynchronous: bool
+        :param asynchronous: if True, performs the action asynchronously
+
+        :return: the value of the column(s) specified in the `returning` field, for each row
+        """
+
+        # nothing to insert, an insert without values would add a row with the default values
+        if not rows:
+            return gen.maybe_future([]) if asynchronous else []
+
+        cls._ensure_columns()
 
         # if no `returning` columns are specified, add the primary key columns
-        returning = returning if len(returning) else cls.__table__.primary_key.columns
-        command = command.returning(*returning)
+        returning = tuple(returning) if returning else cls._default_returning
+
+        # a single row is inserted with a cached statement that receives the values as params
+        if len(rows) == 1:
+            params = rows[0]
+            keys = tuple(params)
+            command = cls._get_compiled_statement(
+                ('insert', keys, returning),
+                lambda: cls.__table__.insert().returning(*returning),
+                column_keys=keys)
+
+            return DBConnection.execute_command(
+                command=command, params=params, asynchronous=asynchronous)
+
+        # postgres limits the number of bind parameters of a statement, so large batches are
+        # split into several inserts, executed in a single transaction
+        chunk_size = max(1, _MAX_BIND_PARAMS // max(1, len(rows[0])))
+        if len(rows) > chunk_size:
+            chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+            if asynchronous:
+                return cls._create_chunks_async(chunks, returning)
+
+            return run_sync(func=cls._create_chunks_async, chunks=chunks, returning=returning)
+
+        command = cls.__table__.insert().values(list(rows)).returning(*returning)
 
-        return DBConnection.execute_command(command=command, async=async)
+        return DBConnection.execute_command(command=command, asynchronous=asynchronous)
+
+    @classmethod
+    @gen.coroutine
+    def _create_chunks_async(cls, chunks, returning):
+        """ Inserts the given chunks of rows in a single transaction, one insert per chunk.
+
+        :type chunks: list[list[dict]]
+        :param chunks: the chunks of rows to be inserted
+
+        :type returning: tuple
+        :param returning: the columns which will be returned after the insert is performed
 
-    def delete(self, async=True):
+        :rtype: list
+        :return: the value of the `returning` columns, for each row
+        """
+
+        commands = [
+            cls.__table__.insert().values(list(chunk)).returning(*returning) for chunk in chunks]
+        cursors = yield DBConnection.execute_transaction(commands)
+
+        return [
+            QueryBuilder.list_mapper(values, cursor.description)
+            for cursor in cursors for values in cursor.fetchall()]
+
+    def delete(self, asynchronous=True):
         """ Deletes this instance from the database.
 
-        :type async: bool
-        :param async: if True, it will perform the action asynchronously.
+        :type asynchronous: bool
+        :param asynchronous: if True, it will perform the action asynchronously.
         """
 
-        self.delete_element(
-            condition=QueryBuilder.build_pk_clause(self.__table__, **self.get_pk_fields()),
-            async=async)
+        command = self._get_compiled_statement(
+            'delete_by_pk', lambda: self.__table__.delete().where(self._build_pk_bind_clause()))
+
+        return DBConnection.execute_command(
+            command=command, params=self._get_pk_params(self.get_pk_fields()),
+            asynchronous=asynchronous)
 
     @classmethod
-    def delete_element(cls, condition=None, async=True):
+    def delete_element(cls, condition=None, asynchronous=True):
         """ Performs a delete with the given condition.
 
         :type condition:
             sqlalchemy.sql.elements.BooleanClauseList|sqlalchemy.sql.elements.BinaryExpression
         :param condition: the condition on which the delete will be performed
 
-        :type async: bool
-        :param async: if True, it will perform the action asynchronously
+        :type asynchronous: bool
+        :param asynchronous: if True, it will perform the action asynchronously
         """
 
         command = cls.__table__.delete()
@@ -101,7 +265,7 @@ class DBEntity(object):
         if condition is not None:
             command = command.where(condition)
 
-        return DBConnection.execute_command(command=command, async=async)
+        return DBConnection.execute_command(command=command, asynchronous=asynchronous)
 
     def get_all_fields(self, filtered=False):
         """ Retrieves a dict of all column names and their values.
@@ -131,75 +295,232 @@ class DBEntity(object):
         return QueryBuilder.columns_to_dict(self, self.pk_columns, filtered=False)
 
     @classmethod
-    def get(cls, condition=None, async=True):
+    def get(cls, condition=None, asynchronous=True):
         """ Retrieve a list of elements from the database using the given condition.
 
         :type condition:
             sqlalchemy.sql.elements.BooleanClauseList|sqlalchemy.sql.elements.BinaryExpression
         :param condition: the condition applied when selecting the elements
 
-        :type async: bool
-        :param async: if True, retrieves the result asynchronously
+        :type asynchronous: bool
+        :param asynchronous: if True, retrieves the result asynchronously
 
         :rtype: concurrent.Future|list
         :return: a Future for the result or a list of elements
         """
 
-        # build the sql command
-        command = cls.__table__.select()
+        # build the sql command, the select without condition is always the same
+        if condition is None:
+            command = cls._get_compiled_statement('select', cls.__table__.select)
+        else:
+            command = cls.__table__.select().where(condition)
+
+        return cls._execute_select(command=command, asynchronous=asynchronous)
+
+    @classmethod
+    def stream(cls, on_batch, condition=None, batch_size=None, asynchronous=True):
+        """ Retrieves the elements matching the given condition in batches, through a
+        server-side cursor. Only one batch of elements is held in memory at a time.
+
+        :type on_batch: collections.abc.Callable
+        :param on_batch: a function that receives the list of elements of each batch. It can
+            return a Future, in which case the next batch waits for it.
+
+        :type condition:
+            sqlalchemy.sql.elements.BooleanClauseList|sqlalchemy.sql.elements.BinaryExpression
+        :param condition: the condition applied when selecting the elements
+
+        :type batch_size: int
+        :param batch_size: the number of elements in a batch. Defaults to the `batch_size`
+            from the database configuration
+
+        :type asynchronous: bool
+        :param asynchronous: if True, retrieves the result asynchronously
+
+        :return: a Future which is done after the last batch, if asynchronous is True
+        """
+
+        if condition is None:
+            command = cls._get_compiled_statement('select', cls.__table__.select)
+        else:
+            command = cls.__table__.select().where(condition)
+
+        cls._ensure_columns()
+
+        return DBConnection.stream_command(
+            command=command, on_batch=on_batch, batch_size=batch_size,
+            row_parser=cls._from_row, asynchronous=asynchronous)
+
+    @classmethod
+    def get_columns(cls, condition=None, columns=None, asynchronous=True):
+        """ Retrieves the values of the given columns for the elements matching the condition,
+        one list of values per column. No instance is built for the rows, which makes it
+        suitable for large reads whose values are processed column by column.
+
+        :type condition:
+            sqlalchemy.sql.elements.BooleanClauseList|sqlalchemy.sql.elements.BinaryExpression
+        :param condition: the condition applied when selecting the elements
+
+        :type columns: list[str]
+        :param columns: the keys of the selected columns. Defaults to all the columns
+
+        :type asynchronous: bool
+        :param asynchronous: if True, retrieves the result asynchronously
+
+        :rtype: concurrent.Future|OrderedDict
+        :return: a Future for the result or a dict of the column keys and their values
+        """
+
+        if asynchronous:
+            return cls._get_columns_async(condition=condition, columns=columns)
+
+        return run_sync(func=cls._get_columns_async, condition=condition, columns=columns)
+
+    @classmethod
+    @gen.coroutine
+    def _get_columns_async(cls, condition=None, columns=None):
+        """ Retrieves the values of the given columns asynchronously, one list per column.
+
+        :type condition:
+            sqlalchemy.sql.elements.BooleanClauseList|sqlalchemy.sql.elements.BinaryExpression
+        :param condition: the condition applied when selecting the elements
+
+        :type columns: list[str]
+        :param columns: the keys of the selected columns. Defaults to all the columns
+
+        :rtype: OrderedDict
+        :return: a dict of the column keys and their values
+        """
+
+        table_columns = cls.__table__.columns
+        selected = [table_columns[key] for key in columns] if columns else list(table_columns)
+
+        command = sqlalchemy.select(selected)
         if condition is not None:
             command = command.where(condition)
 
-        # build the row parser to convert to class instance
-        row_parser = partial(QueryBuilder.list_mapper, converter=cls)
+        rows = yield DBConnection.execute_command(
+            command=command, row_parser=QueryBuilder.values_mapper)
+
+        # transpose the rows into one list of values per column
+        values = zip(*rows) if rows else [()] * len(selected)
+
+        return OrderedDict(
+            (column.key, list(column_values)) for column, column_values in zip(selected, values))
+
+    @classmethod
+    def _execute_select(cls, command, params=None, asynchronous=True):
+        """ Executes a select and converts the resulting rows to instances of this class.
+
+        :param command: the select command
+
+        :type params: dict
+        :param params: the values of the bind parameters of the command
 
-        return DBConnection.execute_command(command=command, row_parser=row_parser, async=async)
+        :type asynchronous: bool
+        :param asynchronous: if True, retrieves the result asynchronously
+
+        :rtype: concurrent.Future|list
+        :return: a Future for the result or a list of elements
+        """
+
+        cls._ensure_columns()
+
+        return DBConnection.execute_command(
+            command=command, params=params, row_parser=cls._from_row, asynchronous=asynchronous)
 
     @classmethod
-    def get_first(cls, condition=None, async=True):
+    def _from_row(cls, values, columns):
+        """ Builds an instance from a row, used as a row parser for selects. The values come
+        from the table columns, so the keyword validation done by `__init__` is skipped and
+        the values are stored directly on the instance.
+
+        :type values: list
+        :param values: the row values
+
+        :param columns: the columns (cursor.description)
+
+        :return: the resulting instance
+        """
+
+        entity = cls._sa_class_manager.new_instance()
+        entity.__dict__.update(zip((column[0] for column in columns), values))
+
+        return entity
+
+    @classmethod
+    def get_first(cls, condition=None, asynchronous=True):
         """ Retrieves the first element returned by a select with the specified condition,
         or None.
 
-        :rtype: sqlalchemy.sql.elements.BooleanClauseList|sqlalchemy.sql.elements.BinaryExpression
+        :type condition:
+            sqlalchemy.sql.elements.BooleanClauseList|sqlalchemy.sql.elements.BinaryExpression
         :param condition: the condition for the select
 
-        :type async: bool
-        :param async: if True, retrieves the result asynchronously
+        :type asynchronous: bool
+        :param asynchronous: if True, retrieves the result asynchronously
 
         :return: an instance of this class or a Future object
         """
 
-        result = cls.get(condition=condition, async=False)
+        # only the first row is needed, so the database doesn't have to return the others
+        if condition is None:
+            command = cls._get_compiled_statement(
+                'select_first', lambda: cls.__table__.select().limit(1))
+        else:
+            command = cls.__table__.select().where(condition).limit(1)
 
-        # for async result, return the future to be handled elsewhere
-        if async:
-            return result
+        # for async result, return a future which resolves to the element
+        if asynchronous:
+            return cls._get_first_async(command)
 
-        if not result:
-            return None
+        result = cls._execute_select(command=command, asynchronous=False)
 
-        return result[0]
+        return result[0] if result else None
 
     @classmethod
-    def get_by_pk(cls, async=True, **kwargs):
+    @gen.coroutine
+    def _get_first_async(cls, command):
+        """ Retrieves the first element returned by the given select asynchronously, or None.
+
+        :param command: the select command
+
+        :return: an instance of this class or None
+        """
+
+        result = yield cls._execute_select(command=command)
+
+        return result[0] if result else None
+
+    @classmethod
+    def get_by_pk(cls, asynchronous=True, **kwargs):
         """ Retrieve an element by primary key(s).
 
-        :type async: bool
-        :param async: if True, retrieves the result asynchronously
+        :type asynchronous: bool
+        :param asynchronous: if True, retrieves the result asynchronously
 
         :type kwargs: dict
         :param kwargs: the primary key fields and their values
 
-        :return: if async is True, it will return a Future.
-        If async is False, it will return a list of objects, or None
+        :return: if asynchronous is True, it will return a Future.
+        If asynchronous is False, it will return a list of objects, or None
         """
 
-        result = cls.get(
-            condition=QueryBuilder.build_pk_clause(cls.__table__, **kwargs),
-            async=async)
+        cls._ensure_columns()
+
+        missing_keys = [key for key, _ in cls.pk_columns if key not in kwargs]
+        if missing_keys:
+            raise PartialPrimaryKeyException(missing_keys=missing_keys)
+
+        # the pk values are passed as bind parameters to a statement compiled once per class
+        command = cls._get_compiled_statement(
+            'select_by_pk', lambda: cls.__table__.select().where(cls._build_pk_bind_clause()))
+
+        result = cls._execute_select(
+            command=command, params=cls._get_pk_params(kwargs), asynchronous=asynchronous)
 
         # return async result
-        if async:
+        if asynchronous:
             return result
 
         # check if sync result is None
@@ -214,22 +535,105 @@ class DBEntity(object):
         # return the first and only element
         return result[0]
 
-    def save(self, async=True):
+    @classmethod
+    def get_many_by_pks(cls, pk_values, asynchronous=True):
+        """ Retrieve the elements with the given primary key(s) using a single select, instead
+        of one select per element.
+
+        :type pk_values: list[dict]
+        :param pk_values: the primary key fields and their values, for each element
+
+        :type asynchronous: bool
+        :param asynchronous: if True, retrieves the result asynchronously
+
+        :rtype: concurrent.Future|list
+        :return: a Future for the result or a list of elements. The elements which are not
+            found are missing from the list
+        """
+
+        cls._ensure_columns()
+
+        for values in pk_values:
+            missing_keys = [key for key, _ in cls.pk_columns if key not in values]
+            if missing_keys:
+                raise PartialPrimaryKeyException(missing_keys=missing_keys)
+
+        if not pk_values:
+            return gen.maybe_future([]) if asynchronous else []
+
+        keys = [key for key, _ in cls.pk_columns]
+        columns = cls._default_returning
+
+        # a single pk column is compared directly, composite pks as a row value
+        if len(columns) == 1:
+            condition = columns[0].in_([values[keys[0]] for values in pk_values])
+        else:
+            condition = sqlalchemy.tuple_(*columns).in_(
+                [tuple(values[key] for key in keys) for values in pk_values])
+
+        return cls._execute_select(
+            command=cls.__table__.select().where(condition), asynchronous=asynchronous)
+
+    def save(self, asynchronous=True):
         """ Saves the instance to the database and fills in the generated values.
 
-        :type async: bool
-        :param async: If True, will run the command asynchronously.
+        :type asynchronous: bool
+        :param asynchronous: If True, will run the command asynchronously.
         """
 
         # TODO: fill in based on custom subclass `returning` list for default/generated values
-        returned = self.create(async=async, **self.get_non_pk_fields(filtered=True))
-        if len(returned) != 1:
-            raise SaveEntityFailedException(
-                'Invalid number of pk fields used - {}.'.format(len(returned)))
+        return self.save_many([self], asynchronous=asynchronous)
+
+    @classmethod
+    def save_many(cls, entities, asynchronous=True):
+        """ Saves all the given instances to the database and fills in the generated values.
+        The instances which have the same fields set are inserted with a single command.
+
+        :type entities: list[DBEntity]
+        :param entities: the instances to be saved
+
+        :type asynchronous: bool
+        :param asynchronous: If True, will run the command asynchronously.
+        """
+
+        if asynchronous:
+            return cls._save_many_async(entities)
+
+        return run_sync(func=cls._save_many_async, entities=entities)
 
-        returned = returned[0]  # type: dict
-        for k, v in returned.items():
-            setattr(self, k, v)
+    @classmethod
+    @gen.coroutine
+    def _save_many_async(cls, entities):
+        """ Saves all the given instances to the database asynchronously.
+
+        :type entities: list[DBEntity]
+        :param entities: the instances to be saved
+        """
+
+        # a multi-row insert needs the same columns for all rows, so group the rows by them
+        groups = OrderedDict()
+        for entity in entities:
+            fields = entity.get_non_pk_fields(filtered=True)
+            groups.setdefault(tuple(fields), []).append((entity, fields))
+
+        for keys, group in groups.items():
+            if keys:
+                returned = yield cls.create_many([fields for _, fields in group])
+            else:
+                # a multi-row insert can't have rows without values, so the entities with no
+                # fields set are inserted one by one, with the cached DEFAULT VALUES insert
+                results = yield [cls.create_many([{}]) for _ in group]
+                returned = [values for result in results for values in result]
+
+            if len(returned) != len(group):
+                raise SaveEntityFailedException(
+                    'Invalid number of rows returned - {}.'.format(len(returned)))
+
+            # the returned rows are matched to the entities by position. PostgreSQL doesn't
+            # guarantee the order of the RETURNING rows of a multi-row insert, this relies on the
+            # observed behaviour of returning them in the order of the VALUES list
+            for (entity, _), values in zip(group, returned):
+                entity.__dict__.update(values)
 
     def sync(self):
         """ Synchronizes the data this instance holds with the data in the db. PK on this instance
@@ -242,30 +646,44 @@ class DBEntity(object):
         if len(missing_pk):
             raise PartialPrimaryKeyException(missing_keys=missing_pk.keys())
 
-        self.copy_fields(self.get_by_pk(async=False, **pk))
+        self.copy_fields(self.get_by_pk(asynchronous=False, **pk))
 
-    def update(self, async=True):
+    def update(self, asynchronous=True):
         """ Updates the database with the information from this instance.
 
-        :type async: bool
-        :param async: if True, it will perform the action asynchronously.
+        :type asynchronous: bool
+        :param asynchronous: if True, it will perform the action asynchronously.
         """
 
-        self.update_element(
-            condition=QueryBuilder.build_pk_clause(self.__table__, **self.get_pk_fields()),
-            async=async, **self.get_non_pk_fields(filtered=True)
-        )
+        params = self.get_non_pk_fields(filtered=True)
+
+        # there is nothing to update, an update without columns is not valid SQL
+        if not params:
+            return gen.maybe_future([]) if asynchronous else []
+
+        keys = tuple(params)
+
+        # the statement is cached for each set of updated columns
+        command = self._get_compiled_statement(
+            ('update_by_pk', keys),
+            lambda: self.__table__.update().where(self._build_pk_bind_clause()),
+            column_keys=keys)
+
+        params.update(self._get_pk_params(self.get_pk_fields()))
+
+        return DBConnection.execute_command(
+            command=command, params=params, asynchronous=asynchronous)
 
     @classmethod
-    def update_element(cls, condition=None, async=True, **kwargs):
+    def update_element(cls, condition=None, asynchronous=True, **kwargs):
         """ Performs an update with the given args and condition.
 
         :type condition:
             sqlalchemy.sql.elements.BooleanClauseList|sqlalchemy.sql.elements.BinaryExpression
         :param condition: the condition on which the update will be performed.
 
-        :type async: bool
-        :param async: if True, it will run the command asynchronously.
+        :type asynchronous: bool
+        :param asynchronous: if True, it will run the command asynchronously.
 
         :type kwargs: dict
         :param kwargs: args with values to be updated
@@ -276,20 +694,14 @@ class DBEntity(object):
         if condition is not None:
             command = command.where(condition)
 
-        return DBConnection.execute_command(command=command, async=async)
+        return DBConnection.execute_command(command=command, asynchronous=asynchronous)
 
     def __repr__(self):
         """ Returns the representation of this instance. """
 
-        # sort the column keys
-        sorted_columns = sorted(self.__table__.columns, key=lambda c: c.key)
-
-        # build a generator for the instance attributes
-        sorted_pairs = ((column.key, getattr(self, column.key)) for column in sorted_columns)
+        self._ensure_columns()
 
-        return '<{name}: {data}>'.format(
-            name=self.__class__.__name__,
-            data=', '.join('{} = {}'.format(k, v) for k, v in sorted_pairs))
+        return self._repr_template.format(*[getattr(self, key) for key in self._repr_keys])
 
     # str of this object will return the same as repr
     __str__ = __repr__
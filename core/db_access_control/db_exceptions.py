@@ -14,34 +14,31 @@ class IncorrectResultSizeException(Exception):
         :param expected: the expected size of the result
         """
 
-        self.args = (
+        super(IncorrectResultSizeException, self).__init__(
             'Result set does not contain exactly {} result(s). Received {} items.'.format(
-                expected, received),
-        )
-        super(IncorrectResultSizeException, self).__init__(*self.args)
+                expected, received))
 
 
 class PartialPrimaryKeyException(Exception):
     """ Raised when some of the primary keys from a multi-field primary key were not provided. """
 
     def __init__(self, missing_keys):
-        self.args = ('Missing primary key fields: {}'.format(', '.join(missing_keys)),)
-
-        super(PartialPrimaryKeyException, self).__init__(*self.args)
+        super(PartialPrimaryKeyException, self).__init__(
+            'Missing primary key fields: {}'.format(', '.join(missing_keys)))
 
 
 class SaveEntityFailedException(Exception):
     """ Called when the creation of an entity failed. """
 
     def __init__(self, reason):
-        self.args = ('Entity creation failed. Reason: {}'.format(reason),)
-
-        super(SaveEntityFailedException, self).__init__(*self.args)
+        super(SaveEntityFailedException, self).__init__(
+            'Entity creation failed. Reason: {}'.format(reason))
 
 
 @gen.coroutine
 def exception_wrapper(
-        function, exception_type=ProgrammingError, message_validator=lambda s: False, **kwargs):
+        function, exception_type=ProgrammingError, expected_sqlstates=frozenset(),
+        message_validator=None, **kwargs):
     """ Wraps a function execution and consumes an exception which matches the type
     and the condition specified.
 
@@ -49,9 +46,13 @@ def exception_wrapper(
 
     :param exception_type: the type of the exception to be consumed
 
+    :type expected_sqlstates: frozenset
+    :param expected_sqlstates: the SQLSTATE codes (see `psycopg2.errorcodes`) for which
+        the exception is ignored
+
     :type message_validator: collections.abc.Callable
     :param message_validator: the condition for the exception message for which the exception
-        is ignored
+        is ignored. It is checked only if the SQLSTATE code did not match.
 
     :type kwargs: dict
     :param kwargs: keyword arguments that will be passed to the function
@@ -64,9 +65,13 @@ def exception_wrapper(
     try:
         result = yield function(**kwargs)
     except exception_type as e:
-        s = str(e.args[0]).strip()
+        # the code is also available on the diagnostics, for errors which don't set pgcode
+        diag = getattr(e, 'diag', None)
+        sqlstate = getattr(e, 'pgcode', None) or getattr(diag, 'sqlstate', None)
+        if sqlstate in expected_sqlstates:
+            return result
 
-        if not message_validator(s):
+        if message_validator is None or not message_validator(str(e.args[0]).strip()):
             raise
 
     return result
@@ -7,7 +7,6 @@ take into account the pre-existence of elements in the databased.
 """
 
 import re
-from copy import copy
 from enum import Enum
 
 from sqlalchemy.ext.compiler import compiles
@@ -25,6 +24,9 @@ ELEMENTS_TO_PATCH = {
     DropSchema
 }
 
+# matches the words of a camel case name
+_CAMEL_CASE_WORD = re.compile('[A-Z][a-z]*')
+
 
 class ConditionVariants(Enum):
     if_not_exists = 'IF NOT EXISTS'
@@ -47,7 +49,9 @@ class ExistConditionPatcher(object):
             connection.execute(CreateTable(table).if_not_exists())
         """
 
-        augmented_self = copy(self)
+        # the copy is built directly, without going through the generic `copy` protocol
+        augmented_self = self.__class__.__new__(self.__class__)
+        augmented_self.__dict__.update(self.__dict__)
         augmented_self._build_condition = value
         return augmented_self
 
@@ -66,7 +70,8 @@ class ExistConditionPatcher(object):
         :return: the modified command
         """
 
-        return re.sub(self.regex, self.condition, command, re.S)
+        # only the statement keyword at the start of the command is replaced
+        return self._compiled_regex.sub(self.condition, command, count=1)
 
     @staticmethod
     def split_camel_case(input_text):
@@ -80,7 +85,7 @@ class ExistConditionPatcher(object):
         :return: the result of the split
         """
 
-        return re.findall('[A-Z][a-z]*', input_text)
+        return _CAMEL_CASE_WORD.findall(input_text)
 
     def __init__(self, element, variant=None, method='', regex='', replacement=''):
         """ Creates a patcher to augment DDL statements.
@@ -122,6 +127,7 @@ class ExistConditionPatcher(object):
         self.condition = replacement or '{} {}'.format(
             ' '.join(name_parts).upper(), self.variant.value
         )
+        self._compiled_regex = re.compile(self.regex, re.S)
 
         self.append_condition_setter()
 
@@ -1,11 +1,45 @@
+import functools
+import itertools
+import operator
+
 import sqlalchemy
 from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.compiler import Compiled
+from sqlalchemy.sql.ddl import DDLElement
 
 from core.db_access_control.db_exceptions import PartialPrimaryKeyException
 from core.db_access_control.ddl_utils.exist_condition_patcher import enable_patches
 
 DIALECT = postgresql.dialect()
 
+
+class _PreparedCompiler(DIALECT.statement_compiler):
+    """ Renders the bind parameters as PostgreSQL positional parameters ($1, $2...). The
+    markers are written while compiling, so the literal text of the statement is left as is. """
+
+    def bindparam_string(self, name, **kwargs):
+        marker = super(_PreparedCompiler, self).bindparam_string(name, **kwargs)
+
+        # the numeric markers are rendered as ':[_POSITION]' and numbered after compiling
+        return '$' + marker[1:] if marker.startswith(':') else marker
+
+
+class _PreparedDialect(postgresql.dialect):
+    statement_compiler = _PreparedCompiler
+
+
+# used to compile the statements with positional parameters, for PREPARE
+_PREPARED_DIALECT = _PreparedDialect(paramstyle='numeric')
+
+# generates the names of the prepared statements
+_statement_names = itertools.count()
+
+# the values left out of the filtered column dicts
+_EMPTY_VALUES = (None, '')
+
+# the command types whose compilers don't accept `literal_binds` (e.g. the DDL elements)
+_no_literal_binds = set()
+
 # enable conditional create/delete SQL statements
 enable_patches()
 
@@ -29,16 +63,45 @@ class QueryBuilder(object):
         """
 
         # create dict with all columns
-        params = {c[0]: getattr(obj, c[0]) for c in columns}
-
         if not filtered:
-            return params
+            return {c[0]: getattr(obj, c[0]) for c in columns}
+
+        # leave out those which are None or Empty, in the same pass. Falsy values like 0 or
+        # False are kept, they are real column values
+        return {
+            c[0]: value for c in columns for value in (getattr(obj, c[0]),)
+            if value not in _EMPTY_VALUES}
+
+    @staticmethod
+    def columns_to_records(objs, columns):
+        """ Retrieves the values of the given columns for several objects, as one tuple per
+        object. The attribute getter is built once for all the objects, instead of looking up
+        the columns separately for each one.
+
+        :type objs: collections.abc.Iterable
+        :param objs: the objects from where the values are extracted
+
+        :type columns: list
+        :param columns: the column names used in building the result
+
+        :rtype: list[tuple]
+        :return: a tuple of column values for each object, in the order of the columns
+        """
+
+        names = [c[0] for c in columns]
+        if not names:
+            return [() for _ in objs]
 
-        # filter out those which are None or Empty
-        return {k: v for k, v in params.items() if v not in (None, '')}
+        getter = operator.attrgetter(*names)
+
+        # with a single name the getter returns the value itself, not a tuple
+        if len(names) == 1:
+            return [(value,) for value in map(getter, objs)]
+
+        return list(map(getter, objs))
 
     @staticmethod
-    def build_clause(comparator, columns, **kwargs):
+    def build_clause(comparator, columns, selectivity=None, **kwargs):
         """ Builds a clause separated by the given comparator.
 
         :type comparator: collections.abc.Callable
@@ -47,14 +110,32 @@ class QueryBuilder(object):
         :type columns: sqlalchemy.sql.base.ColumnCollection
         :param columns: the columns which will be compared
 
+        :type selectivity: dict[str, float]
+        :param selectivity: the estimated fraction of rows matched by the comparison of each
+            column name. If given, the comparisons which are most likely to decide the result
+            are placed first: the most selective ones for AND, the least selective ones for OR.
+            The columns without an estimate are placed last, in their original order
+
         :type kwargs: dict
         :param kwargs: the values associated with the column names which will be compared
 
-        :rtype: sqlalchemy.sql.elements.BooleanClauseList
+        :rtype: sqlalchemy.sql.elements.BooleanClauseList|sqlalchemy.sql.elements.BinaryExpression
         :return: the built clause
         """
 
-        return comparator(*(column == kwargs[column.name] for column in columns))
+        if selectivity:
+            if comparator is sqlalchemy.or_:
+                columns = sorted(columns, key=lambda c: 1 - selectivity.get(c.name, 0))
+            else:
+                columns = sorted(columns, key=lambda c: selectivity.get(c.name, 1))
+
+        clauses = [column == kwargs[column.name] for column in columns]
+
+        # a single comparison doesn't need to be joined (e.g. a single column pk)
+        if len(clauses) == 1:
+            return clauses[0]
+
+        return comparator(*clauses)
 
     @classmethod
     def build_pk_clause(cls, table, **kwargs):
@@ -66,23 +147,25 @@ class QueryBuilder(object):
         :type kwargs: dict
         :param kwargs: the pk names and their desired values
 
-        :rtype: sqlalchemy.sql.elements.BooleanClauseList
+        :rtype: sqlalchemy.sql.elements.BooleanClauseList|sqlalchemy.sql.elements.BinaryExpression
         :return: the built clause
         """
 
-        # get columns which were not specified in kwargs
-        missing_keys = [
-            column.name for column in table.primary_key.columns
-            if column.name not in kwargs]
+        columns = table.primary_key.columns
+
+        # get columns which were not specified in kwargs, with a single set difference
+        missing_keys = {column.name for column in columns} - kwargs.keys()
 
-        if len(missing_keys) != 0:
-            raise PartialPrimaryKeyException(missing_keys=missing_keys)
+        if missing_keys:
+            # the missing keys are reported in the order of the pk columns
+            raise PartialPrimaryKeyException(missing_keys=[
+                column.name for column in columns if column.name in missing_keys])
 
         # join the conditions for the pk using AND operator
-        return cls.build_clause(sqlalchemy.and_, table.primary_key.columns, **kwargs)
+        return cls.build_clause(sqlalchemy.and_, columns, **kwargs)
 
     @staticmethod
-    def list_mapper(values, columns, converter=lambda **kwargs: kwargs):
+    def list_mapper(values, columns, converter=None):
         """ A base row parser that maps the row values to the columns and passes them
         to an object constructor
 
@@ -92,12 +175,109 @@ class QueryBuilder(object):
         :param columns: the columns (cursor.description)
 
         :type converter: collections.abc.Callable
-        :param converter: an object instance constructor
+        :param converter: an object instance constructor. If None, the dict of column names
+            and values is returned as it is.
 
         :return: the resulting object instance
         """
 
-        return converter(**{column[0]: values[index] for index, column in enumerate(columns)})
+        row = dict(zip((column[0] for column in columns), values))
+
+        if converter is None:
+            return row
+
+        return converter(**row)
+
+    @staticmethod
+    def batch_list_mapper(rows, columns, converter=None):
+        """ Maps several rows the same way as `list_mapper`. The column names are extracted
+        once for all the rows, instead of once per row.
+
+        :type rows: list
+        :param rows: the rows values
+
+        :param columns: the columns (cursor.description)
+
+        :type converter: collections.abc.Callable
+        :param converter: an object instance constructor. If None, the dicts of column names
+            and values are returned as they are.
+
+        :rtype: list
+        :return: the resulting object instances
+        """
+
+        names = [column[0] for column in columns]
+
+        if converter is None:
+            return [dict(zip(names, values)) for values in rows]
+
+        return [converter(**dict(zip(names, values))) for values in rows]
+
+    @staticmethod
+    def values_mapper(values, columns):
+        """ A row parser that keeps the row values as they are returned by the driver.
+
+        :type values: tuple
+        :param values: the row values
+
+        :param columns: the columns (cursor.description), not used
+
+        :rtype: tuple
+        :return: the row values
+        """
+
+        del columns  # the values are not mapped to the columns
+
+        return values
+
+    @classmethod
+    def get_compiled_statement(cls, command, params=None, dialect=DIALECT):
+        """ Compiles a SQLAlchemy command to a SQL string with bind parameters. The values are
+        returned separately, so they are sent to the driver instead of being rendered in the
+        SQL string. DDL statements, which can't have bind parameters, are compiled with
+        `get_compiled_command`.
+
+        :param command: the SQLAlchemy command or an already compiled statement
+
+        :type params: dict
+        :param params: the values of the bind parameters, which override the values
+            from the command
+
+        :param dialect: the SQL dialect that will be used for command compiling
+
+        :rtype: tuple
+        :return: the SQL command and the values of its bind parameters
+        """
+
+        if isinstance(command, DDLElement):
+            return cls.get_compiled_command(command, dialect=dialect), params
+
+        if not isinstance(command, Compiled):
+            command = command.compile(dialect=dialect)
+
+        return command.string, command.construct_params(params)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_prepared_statement(compiled):
+        """ Builds the PREPARE form of a compiled statement: a unique name, the SQL with
+        positional parameters ($1, $2...) and the bind parameter names in positional order.
+        The result is cached for each compiled statement.
+
+        :type compiled: sqlalchemy.sql.compiler.Compiled
+        :param compiled: the compiled statement
+
+        :rtype: tuple
+        :return: the name, the SQL and the bind parameter names
+        """
+
+        prepared = compiled.statement.compile(
+            dialect=_PREPARED_DIALECT, column_keys=compiled.column_keys)
+
+        return (
+            'prepared_{}'.format(next(_statement_names)),
+            prepared.string,
+            tuple(prepared.positiontup))
 
     @staticmethod
     def get_compiled_command(command, dialect=DIALECT):
@@ -110,11 +290,17 @@ class QueryBuilder(object):
         :return: the SQL command
         """
 
-        try:
-            return str(command.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
-        except TypeError as t:
-            # suppress exception for literal_binds argument not being expected
-            if 'literal_binds' not in t.args[0]:
-                raise
+        command_type = type(command)
+        if command_type not in _no_literal_binds:
+            try:
+                return str(
+                    command.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+            except TypeError as t:
+                # suppress exception for literal_binds argument not being expected
+                if 'literal_binds' not in t.args[0]:
+                    raise
+
+            # the same type of command won't accept it either, so skip the failing compile
+            _no_literal_binds.add(command_type)
 
-            return str(command)
+        return str(command.compile(dialect=dialect))
@@ -1,22 +1,31 @@
+import functools
+
 from sqlalchemy import create_engine
 
 from core.libs.config_controller import get_config
 
 
+@functools.lru_cache(maxsize=1)
+def _create_engine():
+    """ Creates the database engine. This is done only once since the engine is kept for the
+    lifetime of the process.
+
+    :return: the database engine
+    """
+
+    return create_engine(get_config().database.dsn)
+
+
 def _get_engine(echo=False):
     """ Retrieves the database engine (SQLAlchemy - sync).
 
     :return: the database engine
     """
 
-    db_config = get_config().database
-
-    engine = getattr(_get_engine, '_db_engine', None)
-    if engine is None:
-        engine = create_engine(db_config.dsn)
-        setattr(_get_engine, '_db_engine', engine)
+    engine = _create_engine()
 
-    engine.echo = echo
+    if engine.echo != echo:
+        engine.echo = echo
 
     return engine
 
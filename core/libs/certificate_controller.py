@@ -4,16 +4,32 @@ This module contains classes and methods for certificate creation and signing.
 
 import logging
 import os
-import random
+import secrets
+from concurrent.futures import ProcessPoolExecutor
 
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import ec
 from OpenSSL import crypto
 
 from core.libs.config_controller import get_config
 from core.libs.exceptions import CertificateNotGeneratedException
 
+# the key type for elliptic curve (P-256) keys, which pyOpenSSL can't generate by itself. They
+# are generated much faster than RSA keys of equivalent strength
+TYPE_EC = 'ec'
+
+# the key types which can be set with 'key_type' in the certificates config
+KEY_TYPES = {'rsa': crypto.TYPE_RSA, 'ec': TYPE_EC}
+
+# the entries of a certificate's config which are not subject fields, all the others are copied
+# to the subject
+_NON_SUBJECT_KEYS = frozenset(('dir_path', 'file_name', 'key_type'))
+
 
 class SSLEntity:
-    def __init__(self, subject_dict, default_days_valid=3652, sign_digest='sha512'):
+    def __init__(
+            self, subject_dict, default_days_valid=3652, sign_digest='sha512', create_key=True,
+            key_type=crypto.TYPE_RSA):
         """ Create a SSL entity which can be used to create and manage SSL certificates.
 
         :param dict subject_dict: a dict with values which will be used
@@ -28,6 +44,8 @@ class SSLEntity:
                 emailAddress    - e-mail address\n
         :param int default_days_valid: number of days the certificate will be valid
         :param str sign_digest: digest algorithm used to sign the certificate
+        :param bool create_key: if set to False, the private key is not generated
+        :param key_type: the type of the generated private key: crypto.TYPE_RSA or TYPE_EC
         """
 
         self.subject = subject_dict
@@ -38,7 +56,25 @@ class SSLEntity:
         self.days_valid = default_days_valid
         self.sign_digest = sign_digest
 
-        self.create_private_key()
+        if create_key:
+            self.create_private_key(key_type)
+
+    @classmethod
+    def from_pem(cls, key_pem, certificate_pem):
+        """ Creates an entity from an existing private key and certificate.
+
+        :param bytes key_pem: the private key, in PEM format
+        :param bytes certificate_pem: the certificate, in PEM format
+        :return: the entity holding the loaded key and certificate
+        """
+
+        certificate = crypto.load_certificate(crypto.FILETYPE_PEM, certificate_pem)
+
+        entity = cls(certificate.get_subject(), create_key=False)
+        entity.key = crypto.load_privatekey(crypto.FILETYPE_PEM, key_pem)
+        entity.certificate = certificate
+
+        return entity
 
     # noinspection PyTypeChecker
     def create_certificate(self, issuer=None):
@@ -52,8 +88,8 @@ class SSLEntity:
 
         # set subject
         self._fill_subject(self.certificate, self.subject)
-        # set serial
-        self.certificate.set_serial_number(random.randint(2 ** 127, 2 ** 128 - 1))
+        # set serial, a random 128 bit number from the CSPRNG with the top bit set
+        self.certificate.set_serial_number(secrets.randbits(127) | 1 << 127)
         # set validity start time
         self.certificate.gmtime_adj_notBefore(0)
         # set validity end time
@@ -86,10 +122,15 @@ class SSLEntity:
     def create_private_key(self, digest_type=crypto.TYPE_RSA, size=2048):
         """ Create a private key object.
 
-        :param digest_type: the digest algorithm used to created this key.
-        :param int size: the size of the key to be created
+        :param digest_type: the type of the key (crypto.TYPE_RSA, crypto.TYPE_DSA or TYPE_EC)
+        :param int size: the size of the key to be created, not used for EC keys
         """
 
+        if digest_type == TYPE_EC:
+            self.key = crypto.PKey.from_cryptography_key(
+                ec.generate_private_key(ec.SECP256R1(), default_backend()))
+            return
+
         self.key = crypto.PKey()
         self.key.generate_key(digest_type, size)
 
@@ -101,22 +142,24 @@ class SSLEntity:
         :param bool only_certificate: if set to True, only the certificate will be saved to file
         """
 
-        # save the key if needed
+        directory_path = os.path.normpath(directory_path)
+
+        # both blobs are serialized before any file is opened, so a failed dump doesn't leave
+        # a key on disk without its certificate
+        files = []
         if not only_certificate:
-            self._save_crypto_object(
-                self.key,
-                os.path.join(
-                    os.path.normpath(directory_path),
-                    os.path.normpath('{}.key.pem'.format(file_name))),
-                crypto.dump_privatekey)
-
-        # save the certificate
-        self._save_crypto_object(
-            self.certificate,
-            os.path.join(
-                os.path.normpath(directory_path),
-                os.path.normpath('{}.cert.pem'.format(file_name))),
-            crypto.dump_certificate)
+            files.append((
+                os.path.normpath('{}.key.pem'.format(file_name)),
+                crypto.dump_privatekey(crypto.FILETYPE_PEM, self.key),
+                0o600))
+
+        files.append((
+            os.path.normpath('{}.cert.pem'.format(file_name)),
+            crypto.dump_certificate(crypto.FILETYPE_PEM, self.certificate),
+            0o644))
+
+        for name, data, mode in files:
+            self._save_pem(data, os.path.join(directory_path, name), mode=mode)
 
     @staticmethod
     def _fill_subject(x509_object, target_subject):
@@ -133,23 +176,52 @@ class SSLEntity:
         object_subject = x509_object.get_subject()
 
         for k, v in target_subject.items():
+            if k in _NON_SUBJECT_KEYS:
+                continue
+
             try:
                 setattr(object_subject, k, v)
             except AttributeError:
-                pass
+                logging.warning('Skipped unknown certificate subject field: {}'.format(k))
 
     @staticmethod
-    def _save_crypto_object(obj, path, save_function):
-        """ Saves a x509 object to a file at the specified path.
+    def _save_pem(data, path, mode=0o644):
+        """ Saves PEM data to a file at the specified path.
 
-        :param any obj: the x509* object
+        :param bytes data: the PEM data
         :param str path: the path where the file will be saved.
-        :param function save_function: the function to use
-        :return:
+        :param int mode: the permissions of the file (ex: 0o600 for private keys)
         """
 
-        with open(path, 'wb+') as f:
-            f.write(save_function(crypto.FILETYPE_PEM, obj))
+        # a new file is created with the given permissions and an existing one gets them too,
+        # so a private key is never left readable by others
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        try:
+            if hasattr(os, 'fchmod'):
+                os.fchmod(fd, mode)
+
+            # the data is written directly, it doesn't need a buffered file object
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+
+def _create_signed_certificate(cert_data, ca_key_pem, ca_certificate_pem):
+    """ Creates a certificate signed by the given CA and saves it to file. This runs in a worker
+    process, so the CA is received in PEM format (the crypto objects can't be pickled).
+
+    :param dict cert_data: the certificate subject, key type and file location
+    :param bytes ca_key_pem: the private key of the CA
+    :param bytes ca_certificate_pem: the certificate of the CA
+    """
+
+    cert_ca = SSLEntity.from_pem(ca_key_pem, ca_certificate_pem)
+
+    cert = SSLEntity(cert_data, key_type=KEY_TYPES[cert_data.get('key_type', 'rsa')])
+    cert.create_certificate(cert_ca)
+    cert.save_to_file(cert_data['dir_path'], cert_data['file_name'])
 
 
 def main():
@@ -162,25 +234,34 @@ def main():
     config = get_config('../../config.yml')
 
     # create CA entity
-    cert_ca = SSLEntity(config.certificates.certificates['cert_authority'])
+    ca_data = config.certificates.certificates['cert_authority']
+    cert_ca = SSLEntity(ca_data, key_type=KEY_TYPES[ca_data.get('key_type', 'rsa')])
     cert_ca.create_certificate()
 
     # save CA certificate to file
-    cert_ca.save_to_file(
-        config.certificates.certificates['cert_authority']['dir_path'],
-        config.certificates.certificates['cert_authority']['file_name']
-    )
-
-    # create remaining certificates
-    for cert_key, cert_data in config.certificates.certificates.items():
-        # skip already created CA
-        if cert_key == 'cert_authority':
-            continue
-
-        # create certificate and save to file
-        cert = SSLEntity(cert_data)
-        cert.create_certificate(cert_ca)
-        cert.save_to_file(cert_data['dir_path'], cert_data['file_name'])
+    cert_ca.save_to_file(ca_data['dir_path'], ca_data['file_name'])
+
+    # create remaining certificates, skipping the already created CA
+    certificates = [
+        cert_data for cert_key, cert_data in config.certificates.certificates.items()
+        if cert_key != 'cert_authority']
+
+    if not certificates:
+        return
+
+    ca_key_pem = crypto.dump_privatekey(crypto.FILETYPE_PEM, cert_ca.key)
+    ca_certificate_pem = crypto.dump_certificate(crypto.FILETYPE_PEM, cert_ca.certificate)
+
+    # the certificates don't depend on each other and generating the keys is CPU bound, so
+    # they are created in parallel
+    with ProcessPoolExecutor(max_workers=min(len(certificates), os.cpu_count() or 1)) as executor:
+        futures = [
+            executor.submit(_create_signed_certificate, cert_data, ca_key_pem, ca_certificate_pem)
+            for cert_data in certificates]
+
+        # raise the errors of the workers, if any
+        for future in futures:
+            future.result()
 
 
 if __name__ == '__main__':
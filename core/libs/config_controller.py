@@ -1,13 +1,26 @@
+import functools
 import os
+import re
+
 import yaml
 
 from core.libs.utils import get_parent_directory
 
+# the libyaml based loader is much faster, but it's available only if PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 PROJECT_PATH = get_parent_directory(os.path.abspath(__file__), levels_count=3)
 
 # change this to load a different config file
 APPLICATION_CONFIG_FILE = os.path.normpath(os.path.join(PROJECT_PATH, 'config.yml'))
 
+# matches the config references in strings, ex: '{_[server][host]}'
+_CONFIG_REFERENCE = re.compile(r'\{_((?:\[[^\]]+\])+)\}')
+_REFERENCE_KEY = re.compile(r'\[([^\]]+)\]')
+
 
 def load_config(config_file_path):
     """ Loads a yaml config file into a dict.
@@ -17,8 +30,10 @@ def load_config(config_file_path):
     :rtype: dict
     """
 
-    with open(config_file_path, 'r') as f:
-        config_dict = yaml.load(f)
+    # the file is read as bytes in one go, so the parser decodes it directly (as UTF-8, or the
+    # UTF-16 encoding given by its BOM), instead of going through a text wrapper
+    with open(config_file_path, 'rb') as f:
+        config_dict = yaml.load(f.read(), Loader=_YamlLoader)
 
     # append the base_path element which stores the project directory path
     if 'base_path' not in config_dict or not config_dict['base_path']:
@@ -27,6 +42,23 @@ def load_config(config_file_path):
     return config_dict
 
 
+def _resolve_reference(match, config_dict):
+    """ Retrieves the config value of a reference matched in a string.
+
+    :param match: the match of the reference
+    :param dict config_dict: the configuration dict which contains the referenced value
+    :return: the referenced value, as a string
+    :rtype: str
+    """
+
+    value = config_dict
+    for key in _REFERENCE_KEY.findall(match.group(1)):
+        # same as str.format, the numeric keys are used as indexes
+        value = value[int(key) if key.isdigit() else key]
+
+    return str(value)
+
+
 def recursive_formatter(val, config_dict, is_path=False):
     """ Recursively formats the strings and normalizes paths.
 
@@ -36,25 +68,26 @@ def recursive_formatter(val, config_dict, is_path=False):
     :return: the formatted value
     """
 
-    if type(val) is str:
-        # replace string format placeholders repeatedly until no change is detected
-        # TODO: this can be a security issue. check:
-        # http://lucumr.pocoo.org/2016/12/29/careful-with-str-format/
-        while True:
-            aux = val
-            val = val.format(_=config_dict)
-            if val == aux:
-                break
+    if isinstance(val, str):
+        # replace the references repeatedly, since the referenced values can contain references
+        # too. Only item lookups are done, unlike str.format which also allows attribute access
+        # (see http://lucumr.pocoo.org/2016/12/29/careful-with-str-format/). Strings without
+        # any brace can't contain a reference, so they are skipped. A value seen before means
+        # the references are circular, so the replacing stops there
+        seen = set()
+        while '{' in val and val not in seen:
+            seen.add(val)
+            val = _CONFIG_REFERENCE.sub(lambda match: _resolve_reference(match, config_dict), val)
 
         # if the string is a path, normalize it
         if is_path:
             return os.path.normpath(val)
         return val
 
-    if type(val) is list:
+    if isinstance(val, list):
         return [recursive_formatter(x, config_dict, is_path) for x in val]
 
-    if type(val) is dict:
+    if isinstance(val, dict):
         return {k: recursive_formatter(v, config_dict, 'path' in k) for k, v in val.items()}
 
     return val
@@ -79,11 +112,20 @@ class BaseEntity:
                 raise AttributeError('Object has no attribute {}'.format(k))
 
     def __str__(self):
-        return '<{}>\n{}'.format(
-            self.__class__.__name__,
-            '\n'.join('    \'{}\': {}'.format(
-                k, str(v).replace('\n', '\n    ')
-            ) for k, v in sorted(self.__dict__.items())))
+        lines = ['<{}>'.format(self.__class__.__name__)]
+
+        for k, v in sorted(self.__dict__.items()):
+            if k.startswith('_'):
+                continue
+
+            # only the nested entities span several lines and need to be indented
+            v = str(v)
+            if '\n' in v:
+                v = v.replace('\n', '\n    ')
+
+            lines.append('    \'{}\': {}'.format(k, v))
+
+        return '\n'.join(lines)
 
 
 class BaseConfig(BaseEntity):
@@ -118,9 +160,14 @@ class DatabaseConfig(BaseConfig):
         self.stream_results = None
         self.batch_size = 10000
         self.debug_sql = False
+        self.pool_size = 4
+        self.pool_max_size = None
+        self.prepare_statements = False
 
         super(DatabaseConfig, self).__init__(key_path, config_dict)
 
+        self.pool_max_size = max(self.pool_max_size or self.pool_size, self.pool_size)
+
         self.host = self.host or 'localhost'
         self.dsn = 'postgresql://{user}:{password}@{host}:{port}/{database}'.format(
             user=self.user,
@@ -154,6 +201,31 @@ class WebSocketsConfig(BaseConfig):
 
         super(WebSocketsConfig, self).__init__(key_path, config_dict)
 
+        # the origins are checked on every handshake, so they are looked up in a set
+        self._cors_origins_set = frozenset(self.cors_origins)
+
+        # the Strict-Transport-Security header is sent on every handshake, so it's built once
+        self._sts_header = 'max-age={}; includeSubdomains'.format(self.ws_sts_max_age)
+
+    def get_sts_header(self):
+        """ Retrieves the value of the Strict-Transport-Security header.
+
+        :return: the header value
+        :rtype: str
+        """
+
+        return self._sts_header
+
+    def is_origin_allowed(self, hostname):
+        """ Checks if the given hostname is one of the allowed CORS origins.
+
+        :param str hostname: the hostname of the client origin
+        :return: True if the origin is allowed
+        :rtype: bool
+        """
+
+        return hostname in self._cors_origins_set
+
 
 class CertificatesConfig(BaseConfig):
     """ Stores the SSL certificates configuration parameters. """
@@ -165,6 +237,9 @@ class CertificatesConfig(BaseConfig):
 
         super(CertificatesConfig, self).__init__(key_path, config_dict)
 
+        # the built certificate paths, by certificate key and extension
+        self._cert_paths = {}
+
     def get_cert_path(self, key, ext):
         """ Builds the path to a certificate file.
 
@@ -175,10 +250,15 @@ class CertificatesConfig(BaseConfig):
         :rtype: str
         """
 
-        return os.path.join(
-            os.path.normpath(self.certificates[key]['dir_path']),
-            os.path.normpath('{}.{}.pem'.format(self.certificates[key]['file_name'], ext))
-        )
+        # the certificates config doesn't change, so each path is built only once
+        path = self._cert_paths.get((key, ext))
+        if path is None:
+            path = self._cert_paths[(key, ext)] = os.path.join(
+                os.path.normpath(self.certificates[key]['dir_path']),
+                os.path.normpath('{}.{}.pem'.format(self.certificates[key]['file_name'], ext))
+            )
+
+        return path
 
 
 class ApplicationConfig(BaseEntity):
@@ -205,16 +285,15 @@ class ApplicationConfig(BaseEntity):
         self.database = DatabaseConfig(['database'], config_dict)
 
 
+@functools.lru_cache(maxsize=None)
 def get_config(config_file=''):
-    """ Loads configuration into cache.
+    """ Loads configuration into cache. The configuration is parsed only once per config file,
+    use `get_config.cache_clear()` to force a reload.
 
+    :param str config_file: the file path to load as config file. Defaults to
+        APPLICATION_CONFIG_FILE if empty.
     :return: the app configuration object
     :rtype: ApplicationConfig
     """
 
-    config_file = config_file or APPLICATION_CONFIG_FILE
-
-    if getattr(get_config, '_config', None) is None:
-        setattr(get_config, '_config', ApplicationConfig(config_file))
-
-    return getattr(get_config, '_config')
+    return ApplicationConfig(config_file or APPLICATION_CONFIG_FILE)
@@ -3,17 +3,15 @@ class CertificateNotGeneratedException(Exception):
     """ Raised to signal a certificate was not previously generated. """
 
     def __init__(self, certificate_name):
-        self.args = ('{} certificate is not generated.'.format(certificate_name),)
-        super(CertificateNotGeneratedException, self).__init__(*self.args)
+        super(CertificateNotGeneratedException, self).__init__(
+            '{} certificate is not generated.'.format(certificate_name))
 
 
 class MissingArgsException(Exception):
     """ Raised when a function arguments are missing or not specified. """
 
     def __init__(self, *args):
-        super(MissingArgsException, self).__init__(*args)
-
-        if len(args) != 1:
-            return
+        if len(args) == 1:
+            args = ('Missing function arguments: {}'.format(args[0]),)
 
-        self.args = ('Missing function arguments: {}'.format(args[0]),)
+        super(MissingArgsException, self).__init__(*args)
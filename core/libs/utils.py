@@ -1,5 +1,5 @@
-import inspect
 import os
+import sys
 
 
 def to_string_hex(data):
@@ -9,7 +9,7 @@ def to_string_hex(data):
     :return: a string with the hex codes of the bytes in the input data.
     """
 
-    return ' '.join('{:02x}'.format(x) for x in data)
+    return data.hex(' ')
 
 
 def get_parent_directory(path, levels_count=1):
@@ -28,10 +28,16 @@ def get_parent_directory(path, levels_count=1):
     :rtype: str
     """
 
-    if not levels_count:
-        return path
+    for _ in range(levels_count):
+        parent = os.path.dirname(path)
 
-    return get_parent_directory(os.path.dirname(path), levels_count=levels_count - 1)
+        # the root (or an empty relative path) has no parent, so the remaining levels are skipped
+        if parent == path:
+            break
+
+        path = parent
+
+    return path
 
 
 def get_func_args():
@@ -41,17 +47,18 @@ def get_func_args():
     :return: a dictionary with arguments
     """
 
-    # get calling function frame
-    calling_frame = inspect.stack()[1][0]
+    # get calling function frame, without building the FrameInfo records for the whole stack
+    calling_frame = sys._getframe(1)
 
     try:
-        args = inspect.getargvalues(calling_frame)
+        code = calling_frame.f_code
+        values_dict = calling_frame.f_locals
     finally:
         # explicit cleanup to make sure reference cycles are broken
         del calling_frame
 
-    keys = getattr(args, 'args', [])
-    values_dict = getattr(args, 'locals', {})
+    # positional and keyword-only argument names lead co_varnames
+    keys = code.co_varnames[:code.co_argcount + code.co_kwonlyargcount]
 
     # build dictionary with the calling function args and values
     return {k: values_dict[k] for k in keys}
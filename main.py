@@ -1,3 +1,4 @@
+import functools
 import logging
 import ssl
 
@@ -33,12 +34,15 @@ def set_logger(config):
     enable_pretty_logging(logger=root_logger)
 
 
-def create_server(config, enable_client_validation=True):
-    """ Creates a HTTPS Tornado Server.
+@functools.lru_cache(maxsize=4)
+def create_ssl_context(config, enable_client_validation=True):
+    """ Creates the SSL context of the server. The context is cached for a given configuration,
+    so the certificate files are loaded and parsed only once.
 
     :param config: the application config
     :param enable_client_validation: if set to True, client certificates will be required
         for https connections
+    :rtype: ssl.SSLContext
     """
 
     if enable_client_validation:
@@ -58,6 +62,19 @@ def create_server(config, enable_client_validation=True):
         config.certificates.get_cert_path('server', 'key'),
     )
 
+    return ssl_context
+
+
+def create_server(config, enable_client_validation=True):
+    """ Creates a HTTPS Tornado Server.
+
+    :param config: the application config
+    :param enable_client_validation: if set to True, client certificates will be required
+        for https connections
+    """
+
+    ssl_context = create_ssl_context(config, enable_client_validation)
+
     return httpserver.HTTPServer(Application(debug=config.server.debug), ssl_options=ssl_context)
 
 
@@ -7,7 +7,7 @@ import os
 import click
 
 from build_manager import Requirements
-from build_manager.tools import run_command
+from build_manager.tools import run_command, start_command, wait_command
 
 
 # CONSTANTS
@@ -32,37 +32,96 @@ REQS = {
 }
 
 
-def build_requirements(key):
-    """ Builds a requirements file using the given key.
+def _echo_error(message):
+    """ Prints an error message to stderr.
+
+    :type message: str
+    :param message: the message, without the `Error: ` prefix
+    """
+
+    click.echo(f'Error: {message}', err=True)
+
+
+def _start_build(key):
+    """ Starts the pip-compile command for the given key, after checking that all the input files
+    exist.
 
     :type key: str
     :param key: the key corresponding to the requirements file info in the REQS dict.
 
-    :rtype: bool
-    :return: True - the command was executed succesfully
+    :rtype: subprocess.Popen|None
+    :return: the running process or None if input files are missing
     """
 
     reqs_obj = REQS[key]
     # check that all files exist
     missing_files = reqs_obj.get_missing_in_files()
-    for file in missing_files:
-        click.echo(f'Error: File "{file}" does not exist.', err=True)
-
     if missing_files:
-        return False
+        # all the missing files are reported in a single message
+        _echo_error('Files do not exist:\n  ' + '\n  '.join(missing_files))
+        return None
 
     # execute the command
-    result = run_command(reqs_obj.get_compile_command())
+    return start_command(reqs_obj.get_compile_command())
+
+
+def _finalize_build(key, process):
+    """ Waits for a pip-compile command started by `_start_build` and reports its outcome.
+
+    :type key: str
+    :param key: the key corresponding to the requirements file info in the REQS dict.
+
+    :type process: subprocess.Popen|None
+    :param process: the running process, None if it could not be started
+
+    :rtype: bool
+    :return: True - the command was executed succesfully
+    """
+
+    if process is None:
+        return False
+
+    result = wait_command(process)
 
     # check for successful execution
     if result.returncode != 0:
-        click.echo(f'Error: {result.stderr}', err=True)
+        _echo_error(result.stderr)
         return False
 
     click.echo(f'Build requirements for "{key}" environment.')
     return True
 
 
+def build_requirements(*keys, if_changed=False):
+    """ Builds the requirements files using the given keys. The pip-compile commands are
+    independent, so they are all started before waiting for any of them.
+
+    :type keys: str
+    :param keys: the keys corresponding to the requirements file info in the REQS dict.
+
+    :type if_changed: bool
+    :param if_changed: if True, the files which are newer than their input files are not built
+        again. The files included with `-r` are not checked, and the pins are not re-resolved
+        to newer releases for the skipped files
+
+    :rtype: bool
+    :return: True - all the commands were executed succesfully
+    """
+
+    processes = []
+    for key in keys:
+        # on request, pip-compile is skipped if the input files didn't change
+        if if_changed and REQS[key].is_out_file_up_to_date():
+            click.echo(f'Requirements for "{key}" environment are up to date.')
+            continue
+
+        processes.append((key, _start_build(key)))
+
+    # every process is waited for, even after a failure
+    results = [_finalize_build(key, process) for key, process in processes]
+    return all(results)
+
+
 def sync_venv(key, print_output=True):
     """ Syncs the python virtual env using the given requirements file key.
 
@@ -80,7 +139,7 @@ def sync_venv(key, print_output=True):
 
     # check that out file exists
     if not reqs_obj.check_missing_out_file():
-        click.echo(f'Error: File "{reqs_obj.out_file}" does not exist.', err=True)
+        _echo_error(f'File "{reqs_obj.out_file}" does not exist.')
         return False
 
     # execute the command
@@ -88,7 +147,7 @@ def sync_venv(key, print_output=True):
 
     # check for successful execution
     if result.returncode != 0:
-        click.echo(f'Error: {result.stderr}', err=True)
+        _echo_error(result.stderr)
         return False
 
     # print the output if needed
@@ -110,7 +169,8 @@ def cli():
 @click.option('--all', 'env', flag_value='all', default=True)
 @click.option('--sync', 'sync_action', is_flag=True, default=False)
 @click.option('--build', 'build_action', is_flag=True, default=False)
-def reqs(sync_action=False, build_action=False, env='all'):
+@click.option('--if-changed', 'if_changed', is_flag=True, default=False)
+def reqs(sync_action=False, build_action=False, env='all', if_changed=False):
     """ Command for managing requirements files.
 
     :type sync_action: bool
@@ -120,24 +180,21 @@ def reqs(sync_action=False, build_action=False, env='all'):
     :param build_action: if True, it will perform a pip-compile call
 
     :type env: str
-    :param env: Possible values: `dev`, `live`
+    :param env: Possible values: `dev`, `live`, `all`
+
+    :type if_changed: bool
+    :param if_changed: if True, the out files newer than their input files are not built again
     """
 
-    env = env or 'all'
-
-    if not build_action and not sync_action:
-        build_action = True
-
-    if env == 'all':
-        if build_action:
-            build_requirements('live')
-            build_requirements('dev')
-        if sync_action:
-            click.echo('Error: An environment must be specified to run sync.', err=True)
-    else:
-        if build_action:
-            build_requirements(env)
-        if sync_action:
+    # click always sets env, `all` being the default flag. Building is the default action
+    if build_action or not sync_action:
+        build_requirements(
+            *(('live', 'dev') if env == 'all' else (env,)), if_changed=if_changed)
+
+    if sync_action:
+        if env == 'all':
+            _echo_error('An environment must be specified to run sync.')
+        else:
             sync_venv(env)
 
 
@@ -4,5 +4,23 @@ from sqlalchemy.ext.declarative import declarative_base
 from core.db_access_control.sqla_utils import SQLAUtils
 from core.libs.config_controller import get_config
 
-Base = declarative_base(
-    metadata=MetaData(schema=get_config().database.schema, bind=SQLAUtils.get_engine()))
+
+class _LazyBindMetaData(MetaData):
+    """ A MetaData bound to the application engine, which is created only when the bind is first
+    used (implicit execution), not when the models are imported.
+    """
+
+    @property
+    def bind(self):
+        """ The engine the metadata is bound to. """
+        if self._bind is None:
+            self._bind = SQLAUtils.get_engine()
+        return self._bind
+
+    @bind.setter
+    def bind(self, bind):
+        """ The engine the metadata is bound to. """
+        MetaData.bind.fset(self, bind)
+
+
+Base = declarative_base(metadata=_LazyBindMetaData(schema=get_config().database.schema))
@@ -0,0 +1,6 @@
+from sqlalchemy import Integer, Text
+
+# the column types hold no per-column state, so the models share a single instance of each
+# instead of instantiating the type class for every column
+INTEGER = Integer()
+TEXT = Text()
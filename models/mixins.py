@@ -0,0 +1,9 @@
+from sqlalchemy import Column
+
+from models.column_types import INTEGER
+
+
+class PrimaryKeyMixin(object):
+    """ Adds the integer `uid` primary key column. """
+
+    uid = Column(INTEGER, primary_key=True)
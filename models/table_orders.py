@@ -1,14 +1,6 @@
-from tornado import gen
+import functools
 
-from models.tag import Tag
-from models.user import User
-from models.user_property import UserProperty
 
-_create_order = (User, UserProperty, Tag,)
-_drop_order = (UserProperty, Tag, User,)
-
-
-@gen.coroutine
 def get_table_order(for_drop=False):
     """ Retrieves the order of tables for creation/deletion
 
@@ -20,7 +12,75 @@ def get_table_order(for_drop=False):
     :return: a tuple of tables
     """
 
+    create_order, drop_order = _build_table_orders()
+
+    if for_drop:
+        return drop_order
+
+    return create_order
+
+
+def get_table_levels(tables, for_drop=False):
+    """ Groups tables in levels based on their foreign key dependencies (Kahn's algorithm).
+    The tables in a level depend only on tables from the previous levels, so all the tables
+    in a level can be created or dropped at the same time.
+
+    :type tables: collections.abc.Iterable
+    :param tables: the tables to be grouped
+
+    :type for_drop: bool
+    :param for_drop: if True - the levels will be in the drop order,
+        otherwise they will be in the create order
+
+    :rtype: list
+    :return: a list of levels, each one being a tuple of tables
+    """
+
+    tables = tuple(tables)
+    table_set = set(tables)
+
+    # only the dependencies between the given tables are relevant
+    dependencies = {
+        table: {
+            fk.column.table for fk in table.foreign_keys
+            if fk.column.table in table_set and fk.column.table is not table}
+        for table in tables}
+
+    levels = []
+    while dependencies:
+        level = tuple(table for table in tables if dependencies.get(table) == set())
+        if not level:
+            raise ValueError('Circular foreign key dependency between tables: {}'.format(
+                ', '.join(table.name for table in dependencies)))
+
+        for table in level:
+            del dependencies[table]
+        for remaining in dependencies.values():
+            remaining.difference_update(level)
+
+        levels.append(level)
+
     if for_drop:
-        return tuple(x.__table__ for x in _drop_order)
+        levels.reverse()
+
+    return levels
+
+
+@functools.lru_cache(maxsize=1)
+def _build_table_orders():
+    """ Derives the create and drop orders from the foreign keys. This is done only once, on the
+    first call, so the models are imported only when an order is actually needed.
+
+    :rtype: tuple
+    :return: a tuple with the create order and the drop order
+    """
+
+    from models.tag import Tag
+    from models.user import User
+    from models.user_property import UserProperty
+
+    create_order = tuple(
+        table for level in get_table_levels(x.__table__ for x in (User, UserProperty, Tag,))
+        for table in level)
 
-    return tuple(x.__table__ for x in _create_order)
+    return create_order, tuple(reversed(create_order))
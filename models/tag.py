@@ -1,21 +1,19 @@
-from sqlalchemy import Column
-from sqlalchemy import ForeignKey
-from sqlalchemy import Integer
-from sqlalchemy import Text
+from sqlalchemy import Column, ForeignKey
 from sqlalchemy_utils import LtreeType
 
 from core.db_access_control.db_entity import DBEntity
 from models import Base
+from models.column_types import INTEGER, TEXT
+from models.mixins import PrimaryKeyMixin
 
 
-class Tag(DBEntity, Base):
+class Tag(DBEntity, PrimaryKeyMixin, Base):
     __tablename__ = 'tag'
 
-    uid = Column(Integer, primary_key=True)
     user_id = Column(ForeignKey('user.uid', ondelete='CASCADE'), nullable=False)
 
     path = Column(LtreeType, nullable=False, unique=True)
-    position = Column(Integer, nullable=False)
+    position = Column(INTEGER, nullable=False)
 
-    title = Column(Text)
-    description = Column(Text)
+    title = Column(TEXT)
+    description = Column(TEXT)
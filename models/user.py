@@ -1,19 +1,18 @@
-from sqlalchemy import Column, Text, Integer, Binary
+from sqlalchemy import Column, Binary
 from sqlalchemy.orm import relationship
 
 from core.db_access_control.db_entity import DBEntity
-from core.libs.utils import get_func_args
 from models import Base
+from models.column_types import TEXT
+from models.mixins import PrimaryKeyMixin
 
 
-class User(DBEntity, Base):
+class User(DBEntity, PrimaryKeyMixin, Base):
     __tablename__ = 'user'
 
-    uid = Column(Integer, primary_key=True)
-
-    user_name = Column(Text, unique=True, nullable=False)
-    first_name = Column(Text)
-    last_name = Column(Text)
+    user_name = Column(TEXT, unique=True, nullable=False)
+    first_name = Column(TEXT)
+    last_name = Column(TEXT)
 
     key_hash = Column(Binary)
 
@@ -29,11 +28,10 @@ class User(DBEntity, Base):
             self, user_name=None, uid=None, key=None,
             first_name=None, last_name=None, key_hash=None):
 
-        # fetch all arguments for this function
-        kwargs = get_func_args()
-        kwargs.pop('self')
-
-        if 'key' in kwargs:
-            kwargs['key_hash'] = self.get_hash(kwargs.pop('key'))
+        # the key is stored only as its hash
+        if key is not None:
+            key_hash = self.get_hash(key)
 
-        super().__init__(**kwargs)
+        super().__init__(
+            user_name=user_name, uid=uid, first_name=first_name, last_name=last_name,
+            key_hash=key_hash)
@@ -1,15 +1,16 @@
-from sqlalchemy import Column, ForeignKey, Integer, Text
+from sqlalchemy import Column, ForeignKey
 
 from core.db_access_control.db_entity import DBEntity
 from models import Base
+from models.column_types import TEXT
+from models.mixins import PrimaryKeyMixin
 
 
-class UserProperty(DBEntity, Base):
+class UserProperty(DBEntity, PrimaryKeyMixin, Base):
     __tablename__ = 'user_property'
 
-    uid = Column(Integer, primary_key=True)
     user_id = Column(ForeignKey('user.uid', ondelete='CASCADE'), nullable=False)
 
-    key = Column(Text)
-    value = Column(Text)
-    value_type = Column(Text)
+    key = Column(TEXT)
+    value = Column(TEXT)
+    value_type = Column(TEXT)
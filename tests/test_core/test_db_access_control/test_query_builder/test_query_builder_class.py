@@ -1,6 +1,6 @@
 import unittest
+from types import SimpleNamespace
 
-import mock
 import sqlalchemy
 import sqlalchemy.dialects
 import sqlalchemy.sql.elements
@@ -44,6 +44,24 @@ class ColumnsToDictTestCase(unittest.TestCase):
             'test_attr_2': 'test_val_2',
         })
 
+    def test_filtering_keeps_falsy_values(self):
+        """ Test that filtering removes only None and Empty values, not other falsy values. """
+
+        # customize test resources
+        self.test_columns.extend([('test_attr_4', None), ('test_attr_5', None)])
+        self.test_object.test_attr_1 = None
+        self.test_object.test_attr_4 = 0
+        self.test_object.test_attr_5 = False
+
+        # run test
+        result = qb.QueryBuilder.columns_to_dict(
+            self.test_object, self.test_columns, filtered=True)
+        self.assertDictEqual(result, {
+            'test_attr_2': 'test_val_2',
+            'test_attr_4': 0,
+            'test_attr_5': False,
+        })
+
     def test_non_existent_column(self):
         """ Test exception when a non-existent column is requested. """
 
@@ -55,63 +73,127 @@ class ColumnsToDictTestCase(unittest.TestCase):
             AttributeError, qb.QueryBuilder.columns_to_dict, self.test_object, self.test_columns)
 
 
-class BuildClauseTestCase(unittest.TestCase):
+class ColumnsToRecordsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_columns = [
+            ('test_attr_1', None),  # simulating a Column object from SQLA
+            ('test_attr_2', None),
+        ]
+
+        self.test_objects = [
+            SimpleNamespace(test_attr_1='test_val_1', test_attr_2=None),
+            SimpleNamespace(test_attr_1='test_val_2', test_attr_2=0),
+        ]
+
     def test_happy_flow(self):
-        """ Test successful flow. """
+        """ Test most common successful flow. """
 
-        # build test resources
-        test_comparator = sqlalchemy.and_
-        test_column_1 = sqlalchemy.Column('column_1')
-        test_column_2 = sqlalchemy.Column('column_2')
+        result = qb.QueryBuilder.columns_to_records(self.test_objects, self.test_columns)
+        self.assertListEqual(result, [('test_val_1', None), ('test_val_2', 0)])
 
-        # run test
-        result = qb.QueryBuilder.build_clause(
-            comparator=test_comparator,
-            columns=[test_column_1, test_column_2],
-            column_1=3,
-            column_2='test_string'
-        )
-        compiled_result = qb.QueryBuilder.get_compiled_command(result)
+    def test_single_column(self):
+        """ Test that a single column still results in tuples. """
 
-        self.assertEqual(type(result), sqlalchemy.sql.elements.BooleanClauseList)
-        self.assertEqual(str(compiled_result), "column_1 = 3 AND column_2 = 'test_string'")
+        result = qb.QueryBuilder.columns_to_records(self.test_objects, self.test_columns[:1])
+        self.assertListEqual(result, [('test_val_1',), ('test_val_2',)])
 
-    def test_happy_flow_2(self):
-        """ Test succesful flow. """
+    def test_non_existent_column(self):
+        """ Test exception when a non-existent column is requested. """
 
-        # build test resources
-        test_comparator = sqlalchemy.or_
-        test_column_1 = sqlalchemy.Column('column_1')
-        test_column_2 = sqlalchemy.Column('column_2')
-        test_column_3 = sqlalchemy.Column('column_3')
+        # customize test resources
+        self.test_columns.append(('test_attr_3', None))
 
         # run test
-        result = qb.QueryBuilder.build_clause(
-            comparator=test_comparator,
-            columns=[test_column_1, test_column_2, test_column_3],
-            column_1=3,
-            column_2='test_string',
-            column_3=None
-        )
-        compiled_result = qb.QueryBuilder.get_compiled_command(result)
+        self.assertRaises(
+            AttributeError, qb.QueryBuilder.columns_to_records,
+            self.test_objects, self.test_columns)
 
-        self.assertEqual(type(result), sqlalchemy.sql.elements.BooleanClauseList)
-        self.assertEqual(
-            str(compiled_result),
-            "column_1 = 3 OR column_2 = 'test_string' OR column_3 IS NULL"
-        )
+
+class BuildClauseTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # build_clause doesn't change the columns, so they are shared by all the tests
+        cls.test_columns = [
+            sqlalchemy.Column('column_1'),
+            sqlalchemy.Column('column_2'),
+            sqlalchemy.Column('column_3'),
+        ]
+
+    def test_happy_flow(self):
+        """ Test successful flows, with each comparator. """
+
+        test_cases = [
+            (sqlalchemy.and_, 2, {'column_1': 3, 'column_2': 'test_string'},
+             "column_1 = 3 AND column_2 = 'test_string'"),
+            (sqlalchemy.or_, 3, {'column_1': 3, 'column_2': 'test_string', 'column_3': None},
+             "column_1 = 3 OR column_2 = 'test_string' OR column_3 IS NULL"),
+        ]
+
+        for test_comparator, columns_count, test_values, expected in test_cases:
+            with self.subTest(comparator=test_comparator.__name__):
+                # run test
+                result = qb.QueryBuilder.build_clause(
+                    comparator=test_comparator,
+                    columns=self.test_columns[:columns_count],
+                    **test_values
+                )
+                compiled_result = qb.QueryBuilder.get_compiled_command(result)
+
+                self.assertEqual(type(result), sqlalchemy.sql.elements.BooleanClauseList)
+                self.assertEqual(str(compiled_result), expected)
+
+    def test_single_column(self):
+        """ Test that a single comparison is returned without being joined. """
+
+        for test_comparator in (sqlalchemy.and_, sqlalchemy.or_):
+            with self.subTest(comparator=test_comparator.__name__):
+                # run test
+                result = qb.QueryBuilder.build_clause(
+                    comparator=test_comparator,
+                    columns=self.test_columns[:1],
+                    column_1=3
+                )
+                compiled_result = qb.QueryBuilder.get_compiled_command(result)
+
+                self.assertEqual(type(result), sqlalchemy.sql.elements.BinaryExpression)
+                self.assertEqual(str(compiled_result), 'column_1 = 3')
+
+    def test_selectivity_order(self):
+        """ Test that the comparisons are ordered by the given selectivity. """
+
+        test_selectivity = {'column_1': 0.5, 'column_2': 0.01}
+        test_cases = [
+            (sqlalchemy.and_, "column_2 = 'test_string' AND column_1 = 3 AND column_3 = 4"),
+            (sqlalchemy.or_, "column_1 = 3 OR column_2 = 'test_string' OR column_3 = 4"),
+        ]
+
+        for test_comparator, expected in test_cases:
+            with self.subTest(comparator=test_comparator.__name__):
+                # run test
+                result = qb.QueryBuilder.build_clause(
+                    comparator=test_comparator,
+                    columns=self.test_columns,
+                    selectivity=test_selectivity,
+                    column_1=3,
+                    column_2='test_string',
+                    column_3=4
+                )
+
+                self.assertEqual(str(qb.QueryBuilder.get_compiled_command(result)), expected)
 
 
 class BuildPkClause(unittest.TestCase):
     def test_happy_flow(self):
         """ Test succesful flow. """
 
-        table = mock.MagicMock()  # type: sqlalchemy.Table
-        table.primary_key.columns = [
+        # simulating a SQLA Table, only the pk columns are used
+        table = SimpleNamespace(primary_key=SimpleNamespace(columns=[
             sqlalchemy.Column('pk_part_1'),
             sqlalchemy.Column('pk_part_2'),
             sqlalchemy.Column('pk_part_3')
-        ]
+        ]))
 
         result = qb.QueryBuilder.build_pk_clause(
             table,
@@ -130,13 +212,13 @@ class BuildPkClause(unittest.TestCase):
     def test_partial_key_provided(self):
         """ Test if exception is raised when some pks are not received. """
 
-        table = mock.MagicMock()  # type: sqlalchemy.Table
-        table.primary_key.columns = [
+        # simulating a SQLA Table, only the pk columns are used
+        table = SimpleNamespace(primary_key=SimpleNamespace(columns=[
             sqlalchemy.Column('pk_part_1'),
             sqlalchemy.Column('pk_part_2'),
             sqlalchemy.Column('pk_part_3'),
             sqlalchemy.Column('pk_part_4')
-        ]
+        ]))
 
         with self.assertRaises(db_exceptions.PartialPrimaryKeyException):
             qb.QueryBuilder.build_pk_clause(
@@ -154,3 +236,40 @@ class ListMapperTestCase(unittest.TestCase):
 class GetCompiledCommand(unittest.TestCase):
     # TODO: implement test case
     pass
+
+
+class GetPreparedStatementTestCase(unittest.TestCase):
+    def setUp(self):
+        self.table = sqlalchemy.table(
+            'test_table', sqlalchemy.column('column_1'), sqlalchemy.column('column_2'))
+
+    def test_happy_flow(self):
+        """ Test if the bind parameters are replaced with positional parameters. """
+
+        command = sqlalchemy.select([self.table.c.column_1]).where(sqlalchemy.and_(
+            self.table.c.column_1 == sqlalchemy.bindparam('value_1'),
+            self.table.c.column_2 == sqlalchemy.bindparam('value_2')))
+
+        _, sql, names = qb.QueryBuilder.get_prepared_statement(command.compile(dialect=qb.DIALECT))
+
+        self.assertEqual(
+            sql,
+            'SELECT test_table.column_1 \nFROM test_table \n'
+            'WHERE test_table.column_1 = $1 AND test_table.column_2 = $2'
+        )
+        self.assertEqual(names, ('value_1', 'value_2'))
+
+    def test_literal_text_is_kept(self):
+        """ Test if ':<digits>' text outside the bind parameters is not rewritten. """
+
+        command = sqlalchemy.select([
+            sqlalchemy.literal_column("'12:30'").label('time'),
+            sqlalchemy.literal_column("column_2[1:2]").label('slice')
+        ]).where(self.table.c.column_1 == sqlalchemy.bindparam('value_1'))
+
+        _, sql, names = qb.QueryBuilder.get_prepared_statement(command.compile(dialect=qb.DIALECT))
+
+        self.assertIn("'12:30' AS time", sql)
+        self.assertIn('column_2[1:2] AS slice', sql)
+        self.assertIn('test_table.column_1 = $1', sql)
+        self.assertEqual(names, ('value_1',))
@@ -0,0 +1,66 @@
+import unittest
+
+from core.libs.config_controller import recursive_formatter
+
+
+class RecursiveFormatterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.config_dict = {
+            'server': {
+                'host': 'localhost',
+                'port': 9000,
+                'name': '{_[server][host]}:{_[server][port]}',
+                'url': 'http://{_[server][name]}',
+            },
+            'hosts': ['first', 'second'],
+            'loop_1': '{_[loop_2]}',
+            'loop_2': '{_[loop_1]}',
+        }
+
+    def test_happy_flow(self):
+        """ Test if the references are replaced with the referenced values. """
+
+        cases = [
+            ('{_[server][host]}', 'localhost'),
+            ('{_[server][port]}', '9000'),
+            ('{_[server][host]}:{_[server][port]}', 'localhost:9000'),
+            ('{_[hosts][1]}', 'second'),
+            ('no references', 'no references'),
+        ]
+
+        for value, expected in cases:
+            with self.subTest(value=value):
+                self.assertEqual(recursive_formatter(value, self.config_dict), expected)
+
+    def test_nested_references(self):
+        """ Test if the references within the referenced values are replaced too. """
+
+        self.assertEqual(
+            recursive_formatter('{_[server][url]}/ws', self.config_dict),
+            'http://localhost:9000/ws'
+        )
+
+    def test_circular_references(self):
+        """ Test if circular references stop the replacing instead of looping forever. """
+
+        self.assertEqual(recursive_formatter('{_[loop_1]}', self.config_dict), '{_[loop_1]}')
+
+    def test_braces_are_kept(self):
+        """ Test if the text within braces which is not a reference is left in place. """
+
+        cases = ['{}', '{{}}', '{{_[server][host]}}', '{server}', '{_}', '{_[]}', '{', '}']
+
+        for value in cases:
+            with self.subTest(value=value):
+                expected = value.replace('{_[server][host]}', 'localhost')
+                self.assertEqual(recursive_formatter(value, self.config_dict), expected)
+
+    def test_containers(self):
+        """ Test if the lists and dicts are formatted recursively. """
+
+        result = recursive_formatter(
+            {'names': ['{_[server][host]}', 1], 'log_path': 'logs/../{_[hosts][0]}'},
+            self.config_dict
+        )
+
+        self.assertEqual(result, {'names': ['localhost', 1], 'log_path': 'first'})
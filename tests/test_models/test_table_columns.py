@@ -0,0 +1,46 @@
+import importlib
+import os
+import unittest
+
+from core.libs import config_controller
+
+
+class TableColumnsTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # the models need a config for the schema, the sample one is enough since no engine is
+        # created while the models are loaded
+        cls.config_file = config_controller.APPLICATION_CONFIG_FILE
+        config_controller.APPLICATION_CONFIG_FILE = os.path.join(
+            config_controller.PROJECT_PATH, 'etc', 'config.yml')
+        config_controller.get_config.cache_clear()
+
+        cls.models = importlib.import_module('models')
+        cls.tag = importlib.import_module('models.tag')
+
+    @classmethod
+    def tearDownClass(cls):
+        config_controller.APPLICATION_CONFIG_FILE = cls.config_file
+        config_controller.get_config.cache_clear()
+
+    def test_user_columns(self):
+        """ Test the column order of the user table. """
+
+        self.assertListEqual(
+            [c.name for c in self.models.User.__table__.columns],
+            ['uid', 'user_name', 'first_name', 'last_name', 'key_hash'])
+
+    def test_user_property_columns(self):
+        """ Test the column order of the user_property table. """
+
+        self.assertListEqual(
+            [c.name for c in self.models.UserProperty.__table__.columns],
+            ['uid', 'user_id', 'key', 'value', 'value_type'])
+
+    def test_tag_columns(self):
+        """ Test the column order of the tag table. """
+
+        self.assertListEqual(
+            [c.name for c in self.tag.Tag.__table__.columns],
+            ['uid', 'user_id', 'path', 'position', 'title', 'description'])
@@ -1,9 +1,48 @@
-import json
+import functools
 import logging
 from urllib.parse import urlparse
 
 from tornado import websocket
 
+# orjson parses and serializes much faster, but it's an optional dependency
+try:
+    import orjson as _json
+
+    _dumps = _json.dumps
+except ImportError:
+    import json as _json
+
+    # no whitespace after the separators, so the messages are the same as the orjson ones
+    _dumps = functools.partial(_json.dumps, separators=(',', ':'))
+
+# the response to a message is always the same, so it's serialized only once
+_OK_RESPONSE = _dumps({
+    'data': 'OK',
+    'status': 'OK'
+})
+
+
+def _get_origin_hostname(origin):
+    """ Extracts the hostname from an origin. Accepted formats:
+        'http://example.com:2000'
+        'example.com:2000'
+        'example.com'
+
+    :param str origin: the origin of the client
+    :return: the hostname, in lower case
+    :rtype: str
+    """
+
+    # IPv6 addresses contain colons, so they are left to the full URL parser
+    if '[' in origin:
+        return urlparse(origin if '://' in origin else '//' + origin).hostname
+
+    # drop the scheme, the path and the credentials, then the port
+    host = origin.partition('://')[2] or origin
+    host = host.partition('/')[0].rpartition('@')[2]
+
+    return host.partition(':')[0].lower()
+
 
 class SocketHandler(websocket.WebSocketHandler):
     @property
@@ -15,9 +54,7 @@ class SocketHandler(websocket.WebSocketHandler):
 
     def prepare(self):
         self.set_header(
-            'Strict-Transport-Security',
-            'max-age={}; includeSubdomains'.format(self.app_config.web_sockets.ws_sts_max_age)
-        )
+            'Strict-Transport-Security', self.app_config.web_sockets.get_sts_header())
         super(SocketHandler, self).prepare()
 
     def check_origin(self, origin):
@@ -27,17 +64,9 @@ class SocketHandler(websocket.WebSocketHandler):
         :return: True if the origin is allowed
         """
 
-        logging.info('Client connection attempt: {}'.format(origin))
+        logging.info('Client connection attempt: %s', origin)
 
-        # parse the origin url
-        parsed_origin = urlparse(origin)
-
-        # extract hostname from urls. accepted formats:
-        #   'http://example.com:2000'
-        #   'example.com:2000'
-        #   'example.com'
-        hostname = parsed_origin.hostname or parsed_origin.path.split(':')[0]
-        return hostname in self.app_config.web_sockets.cors_origins
+        return self.app_config.web_sockets.is_origin_allowed(_get_origin_hostname(origin))
 
     def data_received(self, chunk):
         super(SocketHandler, self).data_received(chunk)
@@ -46,12 +75,12 @@ class SocketHandler(websocket.WebSocketHandler):
         logging.info('WebSocket opened.')
 
     def on_message(self, message):
-        message = json.loads(message)
-        print(message)
-        self.write_message(json.dumps({
-            'data': 'OK',
-            'status': 'OK'
-        }))
+        message = _json.loads(message)
+
+        # the message is only formatted if debug logging is enabled
+        logging.debug('WebSocket message: %s', message)
+
+        self.write_message(_OK_RESPONSE)
 
     def on_close(self):
         logging.info('WebSocket closed.')